@@ -1,5 +1,7 @@
 """Configuration management for the cat deterrent system"""
 
+import pathlib
+
 
 class Config:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
     """Configuration class for the cat deterrent system"""
@@ -11,12 +13,10 @@ class Config:  # pylint: disable=too-few-public-methods,too-many-instance-attrib
 
     def _load_config(self):
         """Loads configuration from file"""
-        config = {}
-        with open(self.config_file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                if '=' in line:
-                    key, value = line.split('=', 1)
-                    config[key.strip()] = value.strip()
+        text = pathlib.Path(self.config_file_path).read_text('utf-8')
+        config = {key.strip(): value.strip()
+                  for key, value in (line.split('=', 1)
+                                     for line in text.splitlines() if '=' in line)}
 
         # RTSP and MQTT configuration
         self.rtsp_stream_url = config.get('rtsp_stream_url')
@@ -30,6 +30,8 @@ class Config:  # pylint: disable=too-few-public-methods,too-many-instance-attrib
         self.rtsp_connection_mode = config.get('rtsp_connection_mode', 'continuous').lower()
         if self.rtsp_connection_mode not in ['continuous', 'reconnect_per_frame']:
             self.rtsp_connection_mode = 'continuous'  # Default to continuous
+        # Hardware video decoding through FFmpeg (default: false)
+        self.rtsp_hw_decode = config.get('rtsp_hw_decode', 'false').lower() == 'true'
         self.mqtt_broker_url = config.get('mqtt_broker_url')
         self.mqtt_broker_port = int(config.get('mqtt_broker_port', 1883))
         self.mqtt_topic = config.get('mqtt_topic')
@@ -40,6 +42,16 @@ class Config:  # pylint: disable=too-few-public-methods,too-many-instance-attrib
         self.confidence_threshold = float(config.get('confidence_threshold', 0.5))
         self.usage_threshold = float(config.get('usage_threshold', 0.8))
         self.yolo_model = config.get('yolo_model')  # Optional: if None, auto-detection will be used
+        # Motion gate: skip YOLO when the frame barely changed (0 disables the gate)
+        self.motion_threshold = float(config.get('motion_threshold', 0.0))
+        # Frames per batched YOLO forward pass (GPU only, 1 = no batching)
+        self.batch_size = max(1, int(config.get('batch_size', 1)))
+        # Inference precision (auto = FP16 on Jetson, FP32 elsewhere)
+        self.precision = config.get('precision', 'auto').lower()
+        if self.precision not in ['auto', 'fp16', 'fp32']:
+            self.precision = 'auto'
+        # Detection input size in pixels (0 = hardware default: 640 Jetson, 1280 otherwise)
+        self.detection_size = int(config.get('detection_size', 0))
 
         # Database configuration
         self.db_host = config.get('db_host', 'localhost')
@@ -47,6 +59,8 @@ class Config:  # pylint: disable=too-few-public-methods,too-many-instance-attrib
         self.db_password = config.get('db_password', 'p7eWPjGeIRXtMvCJw--')
         self.db_database = config.get('db_database', 'katzenschreck')
         self.camera_name = config.get('camera_name', 'cam_garten')
+        # Pre-encoded once for SQL parameter binding on every insert
+        self.camera_name_bytes = self.camera_name.encode('utf-8')
 
         # Ignore zone configuration
         ignore_zone_str = config.get('ignore_zone')
@@ -1,82 +1,329 @@
 """Database handler for MariaDB operations"""
 
-import cv2
-import mysql.connector
-from mysql.connector import Error
+import logging
+import math
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 import sys
 import os
+import cv2
 
 # Add the parent directory to the Python path for absolute imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from cat_detector.config import Config
 
+# Prefer the MariaDB C connector: it sends BLOBs over the binary prepared-statement
+# protocol instead of escaping them into the SQL text like mysql.connector does
+try:
+    import mariadb
+    from mariadb import Error
+    # Only used with mysql.connector
+    MySQLConnectionPool = None  # pylint: disable=invalid-name
+except ImportError:
+    mariadb = None
+    from mysql.connector import Error
+    from mysql.connector.pooling import MySQLConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Full-size JPEG: quality 85 with optimized Huffman tables and reduced chroma quality
+# (IMWRITE_JPEG_CHROMA_QUALITY needs OpenCV >= 4.6, older builds just skip it)
+FULL_JPEG_QUALITY = 85
+FULL_JPEG_PARAMS = ([cv2.IMWRITE_JPEG_QUALITY, FULL_JPEG_QUALITY, cv2.IMWRITE_JPEG_OPTIMIZE, 1] +
+                    ([cv2.IMWRITE_JPEG_CHROMA_QUALITY, 75]
+                     if hasattr(cv2, 'IMWRITE_JPEG_CHROMA_QUALITY') else []))
+THUMBNAIL_JPEG_QUALITY = 85
+THUMBNAIL_JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_JPEG_QUALITY]
+
+
+def _cuda_available() -> bool:
+    """Checks whether OpenCV was built with CUDA and a device is present"""
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):
+        return False
 
-class DatabaseHandler:  # pylint: disable=too-few-public-methods
-    """Database handler for MariaDB connection"""
 
-    def __init__(self, config: Config):
+class DatabaseHandler:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """Database handler for MariaDB connection
+
+    save_frame_to_database only enqueues the frame. A background thread encodes
+    queued frames and writes them with one multi-row INSERT per batch instead of
+    one round trip per frame, so callers never wait for encoding or the database.
+    """
+
+    INSERT_SQL = """
+    INSERT INTO detections_images (camera_name, accuracy, blob_jpeg, thumbnail_jpeg)
+    VALUES (%s, %s, %s, %s)
+    """
+
+    def __init__(self, config: Config, batch_size: int = 64,  # pylint: disable=too-many-arguments,too-many-positional-arguments
+                 flush_interval: float = 1.0, max_queue_size: int = 16,
+                 pool_size: int = 4, is_jetson: bool = False):
+        """Initialize the database handler
+
+        Args:
+            config: Application configuration
+            batch_size: Maximum number of rows written per INSERT
+            flush_interval: Maximum seconds a batch waits for more frames
+            max_queue_size: Maximum number of queued frames (oldest are dropped)
+            pool_size: Number of persistent connections kept in the pool
+            is_jetson: Encode JPEGs on the Jetson NVJPEG hardware block if available
+        """
         self.config = config
+        self.pool_size = pool_size
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        # NVJPEG encoder (Jetson only, created on first use)
+        self.is_jetson = is_jetson
+        self._nvjpeg = None
+        self._nvjpeg_checked = False
+        self._nvjpeg_lock = threading.Lock()
+
+        # Persistent GPU buffers for the thumbnail resize (CUDA builds of OpenCV only)
+        self._use_cuda_resize = _cuda_available()
+        self._gpu_frame = cv2.cuda_GpuMat() if self._use_cuda_resize else None
+        self._gpu_thumbnail = cv2.cuda_GpuMat() if self._use_cuda_resize else None
+        self._gpu_lock = threading.Lock()
+
+        # Full-size and thumbnail JPEG encodes release the GIL, so run them side by side
+        self._encode_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="jpeg_encode")
+
+        # Queued (frame, accuracy, jpeg_bytes) items, drained by the background writer
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._drain_thread = threading.Thread(target=self._drain_loop, daemon=True)
+        self._drain_thread.start()
+
+    def _get_pool(self):
+        """Creates the connection pool on first use (the database may be down at startup)"""
+        with self._pool_lock:
+            if self._pool is None and mariadb is not None:
+                self._pool = mariadb.ConnectionPool(
+                    pool_name="katzenschreck",
+                    pool_size=self.pool_size,
+                    pool_reset_connection=False,
+                    host=self.config.db_host,
+                    user=self.config.db_user,
+                    password=self.config.db_password,
+                    database=self.config.db_database,
+                    autocommit=False
+                )
+            elif self._pool is None:
+                self._pool = MySQLConnectionPool(
+                    pool_name="katzenschreck",
+                    pool_size=self.pool_size,
+                    pool_reset_session=False,
+                    host=self.config.db_host,
+                    user=self.config.db_user,
+                    password=self.config.db_password,
+                    database=self.config.db_database,
+                    autocommit=False
+                )
+            return self._pool
 
     def _get_connection(self):
-        """Creates a new database connection"""
+        """Gets a connection from the pool (close() returns it to the pool)"""
         try:
-            connection = mysql.connector.connect(
-                host=self.config.db_host,
-                user=self.config.db_user,
-                password=self.config.db_password,
-                database=self.config.db_database
-            )
-            return connection
+            return self._get_pool().get_connection()
         except Error as e:
-            print(f"Database connection error: {e}")
+            logger.error("Database connection error: %s", e)
+            return None
+
+    def _get_nvjpeg(self):
+        """Returns the NVJPEG encoder on Jetson, or None to use OpenCV's CPU encoder"""
+        if not self._nvjpeg_checked:
+            # Also called from the stream processor's file worker, create it once
+            with self._nvjpeg_lock:
+                if not self._nvjpeg_checked and self.is_jetson:
+                    try:
+                        from nvjpeg import NvJpeg  # pylint: disable=import-outside-toplevel
+                        self._nvjpeg = NvJpeg()
+                        logger.info("✅ Database: Using NVJPEG hardware JPEG encoder")
+                    except (ImportError, RuntimeError) as e:
+                        logger.warning("⚠️  Database: NVJPEG not available (%s), "
+                                       "using CPU JPEG encoder", e)
+                self._nvjpeg_checked = True
+        return self._nvjpeg
+
+    def _encode_jpeg(self, image, quality: int, params):
+        """Encodes an image as JPEG bytes (NVJPEG on Jetson, OpenCV otherwise)
+
+        Returns:
+            JPEG bytes or None if encoding failed
+        """
+        nvjpeg = self._get_nvjpeg()
+        if nvjpeg is not None:
+            # The hardware encoder is a single engine, serialize access to it
+            with self._nvjpeg_lock:
+                return nvjpeg.encode(image, quality)
+
+        success, buffer = cv2.imencode('.jpg', image, params)
+        if not success:
             return None
+        return buffer.tobytes()
+
+    def encode_full_jpeg(self, frame) -> Optional[bytes]:
+        """Encodes a frame like the full-size database image (NVJPEG on Jetson)
+
+        For callers that also need the JPEG elsewhere: pass the result to
+        save_frame_to_database(jpeg_bytes=...) so the frame is encoded once.
+
+        Returns:
+            JPEG bytes or None if encoding failed
+        """
+        return self._encode_jpeg(frame, FULL_JPEG_QUALITY, FULL_JPEG_PARAMS)
+
+    def save_frame_to_database(self, frame, accuracy: float = 0.0,
+                               jpeg_bytes: Optional[bytes] = None) -> bool:
+        """Queues the frame for background encoding and batch insert (non-blocking)
+
+        Args:
+            frame: Frame to store (also used for the thumbnail); must not be
+                modified by the caller afterwards
+            accuracy: Detection confidence stored with the image
+            jpeg_bytes: Already encoded full-size JPEG of the frame; skips the
+                full-size encode when given
+
+        Returns:
+            True once the frame is queued (the oldest queued frame is dropped if full)
+        """
+        item = (frame, accuracy, jpeg_bytes)
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return True
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    logger.warning("⚠️  Database queue full, dropping oldest frame")
+                except queue.Empty:
+                    pass
+
+    def _encode_row(self, frame, accuracy: float, jpeg_bytes: Optional[bytes]):
+        """Encodes a queued frame into a (camera_name, accuracy, jpeg, thumbnail) row
+
+        Returns:
+            Row tuple or None if encoding failed
+        """
+        # Convert frame to JPEG format (keeping original resolution) while the
+        # thumbnail with 300 pixel width is created concurrently
+        jpeg_future = None
+        if jpeg_bytes is None:
+            jpeg_future = self._encode_pool.submit(
+                self._encode_jpeg, frame, FULL_JPEG_QUALITY, FULL_JPEG_PARAMS)
+        thumbnail_future = self._encode_pool.submit(self._create_thumbnail, frame, 300)
+
+        jpeg_data = jpeg_future.result() if jpeg_future else jpeg_bytes
+        thumbnail_data = thumbnail_future.result()
+        if not jpeg_data:
+            logger.error("Error converting frame to JPEG")
+            return None
+
+        if not thumbnail_data:
+            logger.error("Error creating thumbnail")
+            return None
+
+        # Each row owns its JPEG buffers: rows wait for the rest of their batch,
+        # so a shared, reused scratch buffer would be overwritten before it is written
+        return (self.config.camera_name_bytes, accuracy, jpeg_data, thumbnail_data)
+
+    def _insert_rows(self, rows) -> bool:
+        """Writes the rows with a single multi-row INSERT
+
+        Returns:
+            True if the batch was written (or was empty), False on error
+        """
+        if not rows:
+            return True
 
-    def save_frame_to_database(self, frame, accuracy: float = 0.0):
-        """Saves the current frame as JPEG and thumbnail to the database"""
         connection = self._get_connection()
         if not connection:
             return False
 
+        cursor = None
         try:
             cursor = connection.cursor()
+            # mariadb sends executemany() as one bulk binary request, mysql.connector
+            # rewrites it into a single multi-VALUES INSERT
+            cursor.executemany(self.INSERT_SQL, rows)
+            connection.commit()
 
-            # Convert frame to JPEG format (keeping original resolution)
-            success, jpeg_buffer = cv2.imencode('.jpg', frame)
-            if not success:
-                print("Error converting frame to JPEG")
-                return False
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%d frame(s) successfully saved to database "
+                             "(Original size: %d bytes, Thumbnails: %d bytes)",
+                             len(rows), sum(len(row[2]) for row in rows),
+                             sum(len(row[3]) for row in rows))
+            return True
 
-            jpeg_data = jpeg_buffer.tobytes()
+        except Error as e:
+            logger.error("Error saving to database: %s", e)
+            return False
+        finally:
+            if cursor is not None:
+                cursor.close()
+            connection.close()  # Returns it to the pool
 
-            # Create thumbnail with 300 pixel width
-            thumbnail_data = self._create_thumbnail(frame, 300)
-            if not thumbnail_data:
-                print("Error creating thumbnail")
-                return False
+    def _drain_loop(self):
+        """Background thread: encodes queued frames and inserts them in batches
 
-            # Execute insert statement
-            sql = """
-            INSERT INTO detections_images (camera_name, accuracy, blob_jpeg, thumbnail_jpeg)
-            VALUES (%s, %s, %s, %s)
-            """
-            values = (self.config.camera_name, accuracy, jpeg_data, thumbnail_data)
+        A batch is written once batch_size rows are ready or flush_interval
+        seconds after its first frame arrived, whichever comes first. The None
+        sentinel from close() writes the pending batch and ends the thread.
+        """
+        stopping = False
+        while not stopping:
+            rows = []
+            item = self._queue.get()
+            if item is None:
+                return
+            # Monotonic: an NTP step (Jetson without RTC) must not stall or rush a batch
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                try:
+                    row = self._encode_row(*item)
+                except Exception:  # pylint: disable=broad-except
+                    # Skip the frame, a dead writer thread would lose every later one
+                    logger.exception("Error encoding frame for database")
+                    row = None
+                if row:
+                    rows.append(row)
+                remaining = deadline - time.monotonic()
+                if len(rows) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+            try:
+                self._insert_rows(rows)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Error saving to database")
 
-            cursor.execute(sql, values)
-            connection.commit()
+    def close(self, timeout: float = 10.0):
+        """Writes the frames queued so far and stops the background writer
 
-            print(f"Frame successfully saved to database "
-                  f"(Original size: {len(jpeg_data)} bytes, "
-                  f"Thumbnail: {len(thumbnail_data)} bytes)")
-            cursor.close()
-            connection.close()
-            return True
+        No frames may be saved after close().
 
-        except Error as e:
-            print(f"Error saving to database: {e}")
-            if connection:
-                connection.close()
-            return False
+        Args:
+            timeout: Seconds to wait for the writer to finish
+        """
+        try:
+            self._queue.put(None, timeout=timeout)
+            self._drain_thread.join(timeout)
+        except queue.Full:
+            logger.warning("⚠️  Database writer stuck, %d queued frame(s) not saved",
+                           self._queue.qsize())
+        self._encode_pool.shutdown(wait=False)
 
     def _create_thumbnail(self, frame, target_width: int):
         """Creates a thumbnail with the specified width while maintaining aspect ratio"""
@@ -87,18 +334,33 @@ class DatabaseHandler:  # pylint: disable=too-few-public-methods
             aspect_ratio = height / width
             target_height = int(target_width * aspect_ratio)
 
-            # Scale frame to thumbnail size
-            thumbnail = cv2.resize(frame, (target_width, target_height),
-                                  interpolation=cv2.INTER_AREA)
+            if self._use_cuda_resize:
+                thumbnail = self._resize_on_gpu(frame, target_width, target_height)
+            elif target_width / width > 0.5:
+                # Mild downscale: bilinear is faster and visually equivalent here
+                thumbnail = cv2.resize(frame, (target_width, target_height),
+                                      interpolation=cv2.INTER_LINEAR)
+            else:
+                # Halve with pyrDown (SIMD Gaussian + decimate) until within 2x of the
+                # target, then do one INTER_AREA step to the exact thumbnail size
+                thumbnail = frame
+                for _ in range(int(math.log2(width / target_width))):
+                    thumbnail = cv2.pyrDown(thumbnail)
+                thumbnail = cv2.resize(thumbnail, (target_width, target_height),
+                                      interpolation=cv2.INTER_AREA)
 
             # Convert thumbnail to JPEG format
-            success, thumbnail_buffer = cv2.imencode(
-                '.jpg', thumbnail, [cv2.IMWRITE_JPEG_QUALITY, 85])
-            if not success:
-                return None
-
-            return thumbnail_buffer.tobytes()
+            return self._encode_jpeg(thumbnail, THUMBNAIL_JPEG_QUALITY, THUMBNAIL_JPEG_PARAMS)
 
         except (cv2.error, ValueError, TypeError) as e:
-            print(f"Error creating thumbnail: {e}")
+            logger.error("Error creating thumbnail: %s", e)
             return None
+
+    def _resize_on_gpu(self, frame, target_width: int, target_height: int):
+        """Resizes the frame on the GPU, reusing the upload and output buffers"""
+        with self._gpu_lock:
+            self._gpu_frame.upload(frame)
+            cv2.cuda.resize(self._gpu_frame, (target_width, target_height),
+                            dst=self._gpu_thumbnail, interpolation=cv2.INTER_AREA)
+            # Only the small thumbnail is copied back to host memory
+            return self._gpu_thumbnail.download()
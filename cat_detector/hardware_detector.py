@@ -1,10 +1,76 @@
 """Hardware detection for automatic model selection"""
 
+import functools
+import logging
 import platform
-import subprocess
+import shutil
 import os
 from typing import Tuple, Optional
 
+logger = logging.getLogger(__name__)
+
+
+# Hardware properties cannot change while the process is running, so every
+# probe below is evaluated at most once per process.
+
+@functools.lru_cache(maxsize=1)
+def _detect_platform() -> str:
+    """Detect the current platform"""
+    return platform.system().lower()
+
+
+@functools.lru_cache(maxsize=1)
+def _read_device_tree_model() -> str:
+    """Read the board model from the device tree (empty string if unavailable)"""
+    try:
+        with open('/proc/device-tree/model', 'r') as f:
+            return f.read().strip().lower()
+    except OSError:
+        return ''
+
+
+@functools.lru_cache(maxsize=1)
+def _is_jetson_device() -> bool:
+    """Check if running on NVIDIA Jetson device"""
+    # Check for Jetson-specific device tree model
+    if os.path.exists('/proc/device-tree/model'):
+        model = _read_device_tree_model()
+        return 'jetson' in model or 'xavier' in model
+
+    # Check for tegrastats on PATH (no fork/exec of the binary itself)
+    return shutil.which('tegrastats') is not None
+
+
+@functools.lru_cache(maxsize=1)
+def _is_raspberry_pi() -> bool:
+    """Check if running on Raspberry Pi"""
+    return 'raspberry pi' in _read_device_tree_model()
+
+
+@functools.lru_cache(maxsize=1)
+def _get_memory_gb() -> float:
+    """Get total memory in GB"""
+    try:
+        return (os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')) / (1024 ** 3)
+    except (ValueError, OSError, AttributeError):
+        pass
+    # Fallback for platforms without the sysconf names
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    kb = int(line.split()[1])
+                    return kb / (1024 * 1024)  # Convert to GB
+    except (OSError, ValueError, IndexError):
+        pass
+    return 4.0  # Default fallback
+
+
+@functools.lru_cache(maxsize=1)
+def _get_cpu_cores() -> int:
+    """Get number of CPU cores"""
+    return os.cpu_count() or 1
+
 
 class HardwareDetector:
     """Detects hardware platform and suggests optimal YOLO model"""
@@ -16,104 +82,51 @@ class HardwareDetector:
         Args:
             forced_type: Optional hardware type override ('jetson', 'raspberry_pi', 'generic')
         """
-        self.platform = self._detect_platform()
+        self.platform = _detect_platform()
         
         if forced_type:
             # Use forced hardware type instead of auto-detection
             self.is_jetson = forced_type.lower() == 'jetson'
             self.is_raspberry_pi = forced_type.lower() == 'raspberry_pi'
-            print(f"🔧 Hardware type forced to: {forced_type}")
+            logger.info("🔧 Hardware type forced to: %s", forced_type)
         else:
             # Auto-detect hardware
-            self.is_jetson = self._is_jetson_device()
-            self.is_raspberry_pi = self._is_raspberry_pi()
+            self.is_jetson = _is_jetson_device()
+            self.is_raspberry_pi = _is_raspberry_pi()
         
-        self.memory_gb = self._get_memory_gb()
-        self.cpu_cores = self._get_cpu_cores()
-    
-    def _detect_platform(self) -> str:
-        """Detect the current platform"""
-        return platform.system().lower()
+        self.memory_gb = _get_memory_gb()
+        self.cpu_cores = _get_cpu_cores()
     
-    def _is_jetson_device(self) -> bool:
-        """Check if running on NVIDIA Jetson device"""
-        try:
-            # Check for Jetson-specific files and commands
-            if os.path.exists('/proc/device-tree/model'):
-                with open('/proc/device-tree/model', 'r') as f:
-                    model = f.read().strip()
-                    return 'jetson' in model.lower() or 'xavier' in model.lower()
-            
-            # Check for nvidia-smi or tegrastats
-            try:
-                subprocess.run(['tegrastats', '--help'], 
-                             capture_output=True, check=True, timeout=5)
-                return True
-            except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired):
-                pass
-                
-            return False
-        except Exception:
-            return False
-    
-    def _is_raspberry_pi(self) -> bool:
-        """Check if running on Raspberry Pi"""
-        try:
-            if os.path.exists('/proc/device-tree/model'):
-                with open('/proc/device-tree/model', 'r') as f:
-                    model = f.read().strip()
-                    return 'raspberry pi' in model.lower()
-            return False
-        except Exception:
-            return False
-    
-    def _get_memory_gb(self) -> float:
-        """Get total memory in GB"""
-        try:
-            with open('/proc/meminfo', 'r') as f:
-                for line in f:
-                    if line.startswith('MemTotal:'):
-                        kb = int(line.split()[1])
-                        return kb / (1024 * 1024)  # Convert to GB
-        except Exception:
-            pass
-        return 4.0  # Default fallback
-    
-    def _get_cpu_cores(self) -> int:
-        """Get number of CPU cores"""
-        try:
-            return os.cpu_count() or 1
-        except Exception:
-            return 1
-    
-    def get_optimal_model(self) -> Tuple[str, str]:
+    @functools.cached_property
+    def optimal_model(self) -> Tuple[str, str]:
         """
-        Get optimal YOLO model and requirements file based on hardware
+        Optimal YOLO model and requirements file based on hardware (computed once)
         
         Returns:
             Tuple of (model_name, requirements_file)
         """
-        # Always use yolo11x for best accuracy across all platforms
-        if self.is_jetson:
-            return 'yolo11x.pt', 'requirements_jetson.txt'
-        else:
-            return 'yolo11x.pt', 'requirements.txt'
+        # Always use yolo11x for best accuracy across all platforms;
+        # only the requirements file depends on the hardware
+        requirements_file = 'requirements_jetson.txt' if self.is_jetson else 'requirements.txt'
+        return 'yolo11x.pt', requirements_file
     
-    def get_hardware_info(self) -> dict:
-        """Get detailed hardware information"""
+    @functools.cached_property
+    def hardware_info(self) -> dict:
+        """Detailed hardware information (computed once)"""
+        model_name, requirements_file = self.optimal_model
         return {
             'platform': self.platform,
             'is_jetson': self.is_jetson,
             'is_raspberry_pi': self.is_raspberry_pi,
             'memory_gb': self.memory_gb,
             'cpu_cores': self.cpu_cores,
-            'optimal_model': self.get_optimal_model()[0],
-            'requirements_file': self.get_optimal_model()[1]
+            'optimal_model': model_name,
+            'requirements_file': requirements_file
         }
     
     def print_hardware_info(self):
         """Print hardware information to console"""
-        info = self.get_hardware_info()
+        info = self.hardware_info
         print("🔍 Hardware Detection Results:")
         print(f"   Platform: {info['platform']}")
         print(f"   Jetson Device: {'Yes' if info['is_jetson'] else 'No'}")
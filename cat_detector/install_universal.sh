@@ -69,7 +69,7 @@ python3 -c "
 from hardware_detector import HardwareDetector
 from ultralytics import YOLO
 detector = HardwareDetector()
-model_name, _ = detector.get_optimal_model()
+model_name, _ = detector.optimal_model
 print(f'Downloading {model_name}...')
 YOLO(model_name)
 print('Model downloaded successfully!')
@@ -0,0 +1,24 @@
+"""JSON serialization for the MQTT and monitoring hot paths"""
+
+import json
+
+# orjson serializes several times faster than the stdlib encoder and also
+# handles numpy scalars; fall back to json if it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    """Serialize an object to UTF-8 encoded JSON
+
+    Args:
+        obj: JSON-serializable object (numpy scalars are allowed with orjson)
+
+    Returns:
+        JSON document as bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)  # pylint: disable=no-member
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
@@ -1,6 +1,8 @@
 """Main application entry point for the cat deterrent system"""
 
 import argparse
+import logging
+import signal
 import sys
 import os
 
@@ -39,11 +41,23 @@ class KatzenschreckApp:  # pylint: disable=too-few-public-methods
 
     def run(self):
         """Starts the application"""
+        # docker stop / systemctl stop send SIGTERM: finish the frame and clean up
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
         self.processor.run()
 
+    def _handle_signal(self, signum, _frame):
+        """Stops the stream processor on SIGTERM/SIGINT"""
+        print(f"🛑 Received {signal.Signals(signum).name}, shutting down...")
+        self.processor.stop()
+
 
 def main():
     """Main function"""
+    # Plain message format keeps log lines identical to the previous print() output;
+    # set LOG_LEVEL=DEBUG to see per-frame/per-insert details
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+                        format='%(message)s')
     app = KatzenschreckApp()
     app.run()
 
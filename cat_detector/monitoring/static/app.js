@@ -2,6 +2,9 @@
 let ws = null;
 let reconnectInterval = null;
 let frameUpdateInterval = null;
+const jsonDecoder = new TextDecoder('utf-8');
+// Last full snapshot from the server, kept current by merging deltas
+let dashboardState = null;
 
 // Initialize connection
 function init() {
@@ -15,6 +18,8 @@ function connectWebSocket() {
     const wsUrl = `${protocol}//${window.location.host}/ws/monitoring`;
     
     ws = new WebSocket(wsUrl);
+    // Updates arrive as binary frames holding UTF-8 JSON
+    ws.binaryType = 'arraybuffer';
     
     ws.onopen = () => {
         console.log('WebSocket connected');
@@ -27,9 +32,16 @@ function connectWebSocket() {
     
     ws.onmessage = (event) => {
         try {
-            const message = JSON.parse(event.data);
+            const text = typeof event.data === 'string'
+                ? event.data
+                : jsonDecoder.decode(event.data);
+            const message = JSON.parse(text);
             if (message.type === 'update') {
-                updateUI(message.data);
+                dashboardState = message.data;
+                updateUI(dashboardState);
+            } else if (message.type === 'delta' && dashboardState) {
+                applyDelta(message);
+                updateUI(dashboardState);
             }
         } catch (e) {
             console.error('Error parsing WebSocket message:', e);
@@ -53,15 +65,39 @@ function connectWebSocket() {
     };
 }
 
+// Merge a delta broadcast (changed fields and new detections) into the state
+function applyDelta(message) {
+    for (const [section, changes] of Object.entries(message.changes)) {
+        Object.assign(dashboardState[section], changes);
+    }
+    if (message.detections.length > 0) {
+        const known = new Set(dashboardState.detections.map(d => d.recorded_at));
+        const added = message.detections.filter(d => !known.has(d.recorded_at));
+        dashboardState.detections = dashboardState.detections.concat(added).slice(-20);
+    }
+}
+
 // Update frame image (separate from WebSocket for better performance)
 function startFrameUpdates() {
     const frameImg = document.getElementById('live-frame');
+    const frameInterval = 500; // Update at most every 500ms
     let frameCounter = 0;
+    let requestStart = 0;
     
-    frameUpdateInterval = setInterval(() => {
+    // Request the next frame only after the previous one finished loading,
+    // so slow connections don't pile up requests for frames never shown
+    const requestFrame = () => {
         frameCounter++;
+        requestStart = performance.now();
         frameImg.src = `/api/frame?t=${frameCounter}`;
-    }, 500); // Update every 500ms
+    };
+    const scheduleNext = () => {
+        const elapsed = performance.now() - requestStart;
+        frameUpdateInterval = setTimeout(requestFrame, Math.max(0, frameInterval - elapsed));
+    };
+    frameImg.onload = scheduleNext;
+    frameImg.onerror = scheduleNext;
+    requestFrame();
 }
 
 // Update connection status
@@ -148,6 +184,7 @@ function updateTiming(timing) {
     ];
     
     // Filter out optional items with zero value
+    const visibleItems = timingItems.filter(item => !item.optional || item.value > 0);
     // Add frame age if available
     if (timing.frame_age !== undefined && timing.frame_age > 0) {
         visibleItems.push({ 
@@ -210,7 +247,7 @@ function updateDetections(detections) {
         return;
     }
     
-    container.innerHTML = detections.reverse().map(detection => {
+    container.innerHTML = detections.slice().reverse().map(detection => {
         const timeAgo = formatTimeAgo(detection.recorded_at);
         return `
             <div class="detection-item">
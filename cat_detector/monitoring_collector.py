@@ -2,61 +2,202 @@
 
 import threading
 import time
+from itertools import islice
 import cv2
-import io
 from typing import Optional, List, Dict, Any
 from collections import deque
 
+# libjpeg-turbo via PyTurboJPEG returns bytes directly and skips OpenCV's
+# imencode overhead; fall back to OpenCV if the package or library is missing
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _TURBO_JPEG = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    _TURBO_JPEG = None
+
+PREVIEW_JPEG_QUALITY = 75
+_PREVIEW_JPEG_PARAMS = [int(cv2.IMWRITE_JPEG_QUALITY), PREVIEW_JPEG_QUALITY]
+
+
+def _encode_preview_jpeg(frame) -> Optional[bytes]:
+    """Encode a BGR frame as JPEG (quality 75) for the web preview
+
+    Returns:
+        JPEG bytes or None if encoding failed
+    """
+    if _TURBO_JPEG is not None:
+        return _TURBO_JPEG.encode(frame, quality=PREVIEW_JPEG_QUALITY, pixel_format=TJPF_BGR)
+    success, buffer = cv2.imencode('.jpg', frame, _PREVIEW_JPEG_PARAMS)
+    return buffer.tobytes() if success else None
+
+
+class _RollingWindow:
+    """Fixed-size window of floats with O(1) mean, min, max and last value
+
+    Keeps a running sum plus monotonic deques of (index, value) candidates for
+    the minimum and maximum. The sum is recomputed exactly once per window
+    length to stop floating point drift from accumulating. Not thread-safe.
+    """
+
+    __slots__ = ('maxlen', '_values', '_total', '_mins', '_maxs', '_index')
+
+    def __init__(self, maxlen: int):
+        self.maxlen = maxlen
+        self._values = deque(maxlen=maxlen)
+        self._total = 0.0
+        self._mins = deque()
+        self._maxs = deque()
+        self._index = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    def append(self, value: float):
+        """Add a value, evicting the oldest one if the window is full"""
+        if len(self._values) == self.maxlen:
+            self._total -= self._values[0]
+        self._values.append(value)
+        self._total += value
+
+        index = self._index
+        self._index += 1
+        while self._mins and self._mins[-1][1] >= value:
+            self._mins.pop()
+        self._mins.append((index, value))
+        while self._maxs and self._maxs[-1][1] <= value:
+            self._maxs.pop()
+        self._maxs.append((index, value))
+
+        # Drop extrema candidates that have left the window
+        oldest = index - len(self._values) + 1
+        if self._mins[0][0] < oldest:
+            self._mins.popleft()
+        if self._maxs[0][0] < oldest:
+            self._maxs.popleft()
+
+        if self._index % self.maxlen == 0:
+            self._total = sum(self._values)
+
+    def mean(self) -> float:
+        """Mean of the values in the window (0.0 if empty)"""
+        return self._total / len(self._values) if self._values else 0.0
+
+    def min(self) -> float:
+        """Smallest value in the window (0.0 if empty)"""
+        return self._mins[0][1] if self._mins else 0.0
+
+    def max(self) -> float:
+        """Largest value in the window (0.0 if empty)"""
+        return self._maxs[0][1] if self._maxs else 0.0
+
+    def last(self) -> float:
+        """Most recently appended value (0.0 if empty)"""
+        return self._values[-1] if self._values else 0.0
+
+
+class _TimingBreakdown:  # pylint: disable=too-many-instance-attributes
+    """Timing components of the last processed frame, updated in place
+
+    Fixed slots instead of a dict: per-frame updates are plain attribute writes
+    and a dict is only built for API responses. Unknown keys are ignored.
+    """
+
+    __slots__ = (
+        'frame_read',
+        'resize',
+        'detection',
+        'mqtt_publish',
+        'db_queue_wait',
+        'file_queue_wait',
+        'total',
+        'frame_age',  # Age of frame when processed (time between capture and processing)
+        'reconnection_time',  # Time taken to reconnect (reconnect_per_frame mode only)
+        'timestamp_generation',  # Time for timestamp string generation
+        'monitoring_update',  # Time for monitoring frame update (JPEG encoding)
+        'save_database_check',  # Time for hourly database save check
+        'detection_processing',  # Time for processing detections (filtering, annotation)
+        'memory_cleanup',  # Time for memory cleanup operations
+        'unaccounted_time'  # Time not accounted for in other measurements
+    )
+
+    def __init__(self):
+        # Spelled out rather than a setattr loop, so pylint sees every slot
+        self.frame_read = 0.0
+        self.resize = 0.0
+        self.detection = 0.0
+        self.mqtt_publish = 0.0
+        self.db_queue_wait = 0.0
+        self.file_queue_wait = 0.0
+        self.total = 0.0
+        self.frame_age = 0.0
+        self.reconnection_time = 0.0
+        self.timestamp_generation = 0.0
+        self.monitoring_update = 0.0
+        self.save_database_check = 0.0
+        self.detection_processing = 0.0
+        self.memory_cleanup = 0.0
+        self.unaccounted_time = 0.0
+
+    def update(self, timing: Dict[str, float]):
+        """Overwrite the components present in timing"""
+        for name, value in timing.items():
+            if name in self.__slots__:
+                setattr(self, name, value)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Return all components as a new dict"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
 
 class MonitoringCollector:
-    """Thread-safe collector for monitoring metrics and frame data"""
+    """Thread-safe collector for monitoring metrics and frame data
 
-    def __init__(self, max_history: int = 100):
+    Only the detection and timing history deques are guarded by a lock. Scalars,
+    counters, rolling windows and the timing breakdown have a single writer (the
+    processing loop), and the current frame, rolling statistics and queue status
+    are published as new objects that replace the old ones, so readers always
+    see a complete value without locking.
+    """
+
+    def __init__(self, max_history: int = 100, preview_max_width: int = 640):
         """Initialize the monitoring collector
         
         Args:
             max_history: Maximum number of historical entries to keep
+            preview_max_width: Frames wider than this are downscaled before JPEG encoding
         """
+        # Guards the detection and timing history deques only
         self._lock = threading.Lock()
         self.max_history = max_history
+        self.preview_max_width = preview_max_width
+        # (input shape, preview dsize or None) for the last encoded frame size
+        self._preview_size_cache = (None, None)
         
-        # Current frame (JPEG encoded)
-        self._current_frame_jpeg: Optional[bytes] = None
-        self._current_frame_timestamp: float = 0.0
+        # Current frame as a (frame, timestamp) slot, and the JPEG encoding as a
+        # (frame, jpeg) pair; the JPEG is produced eagerly only while consumers
+        # are attached and otherwise on demand, and is valid while its frame is
+        # still the one in the slot
+        self._frame_slot = (None, 0.0)
+        self._frame_jpeg = (None, None)
+        self._encode_enabled = False
         
-        # Performance metrics
-        self._processing_times = deque(maxlen=max_history)
-        self._fps_history = deque(maxlen=max_history)
+        # Performance metrics: rolling windows touched only by the writer, and
+        # the statistics readers see, republished as a tuple after each update:
+        # (avg fps, current fps, avg/min/max processing time, avg/max frame age)
+        self._processing_times = _RollingWindow(max_history)
+        self._fps_history = _RollingWindow(max_history)
+        self._perf_snapshot = (0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
         self._frame_count = 0
         self._start_time = time.time()
         
         # Detection history
         self._detections_history = deque(maxlen=max_history)
         
-        # Queue status
-        self._db_queue_size = 0
-        self._db_queue_wait_time = 0.0
-        self._file_queue_size = 0
-        self._file_queue_wait_time = 0.0
+        # Queue status: (db size, db wait, file size, file wait)
+        self._queue_status = (0, 0.0, 0, 0.0)
         
-        # Timing breakdown (last frame)
-        self._timing_breakdown = {
-            'frame_read': 0.0,
-            'resize': 0.0,
-            'detection': 0.0,
-            'mqtt_publish': 0.0,
-            'db_queue_wait': 0.0,
-            'file_queue_wait': 0.0,
-            'total': 0.0,
-            'frame_age': 0.0,  # Age of frame when processed (time between capture and processing)
-            'reconnection_time': 0.0,  # Time taken to reconnect (reconnect_per_frame mode only)
-            'timestamp_generation': 0.0,  # Time for timestamp string generation
-            'monitoring_update': 0.0,  # Time for monitoring frame update (JPEG encoding)
-            'save_database_check': 0.0,  # Time for hourly database save check
-            'detection_processing': 0.0,  # Time for processing detections (filtering, annotation)
-            'memory_cleanup': 0.0,  # Time for memory cleanup operations
-            'unaccounted_time': 0.0  # Time not accounted for in other measurements
-        }
+        # Timing breakdown (last frame); written only by the processing loop
+        self._timing_breakdown = _TimingBreakdown()
         
         # System status
         self._is_streaming = False
@@ -64,32 +205,61 @@ class MonitoringCollector:
         self._frames_skipped = 0
         self._total_frames_processed = 0
         self._frame_age = 0.0  # Current frame age in seconds
-        self._frame_age_history = deque(maxlen=max_history)  # History of frame ages
+        self._frame_age_history = _RollingWindow(max_history)  # History of frame ages
         
         # Historical timing data for profiling
         self._timing_history = deque(maxlen=max_history)  # History of timing breakdowns
 
+    def set_encode_enabled(self, enabled: bool):
+        """Enable or disable eager JPEG encoding in update_frame
+        
+        While disabled, update_frame only stores the frame reference and
+        get_current_frame encodes on demand.
+        
+        Args:
+            enabled: Whether consumers are attached that want every frame
+        """
+        self._encode_enabled = enabled
+
     def update_frame(self, frame, timestamp: Optional[float] = None):
         """Update the current frame (JPEG encoded for web display)
         
         Args:
-            frame: OpenCV frame (numpy array)
+            frame: OpenCV frame (numpy array); must not be modified afterwards,
+                since it may be encoded later
             timestamp: Optional timestamp, defaults to current time
         """
         if frame is None:
             return
-            
-        try:
+
+        if self._encode_enabled:
             # Encode frame as JPEG (lower quality for web streaming)
-            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), 75]
-            success, buffer = cv2.imencode('.jpg', frame, encode_param)
-            if success:
-                with self._lock:
-                    self._current_frame_jpeg = buffer.tobytes()
-                    self._current_frame_timestamp = timestamp or time.time()
-                    self._last_frame_time = self._current_frame_timestamp
+            self._frame_jpeg = (frame, self._encode_frame(frame))
+
+        self._frame_slot = (frame, timestamp or time.time())
+        self._last_frame_time = self._frame_slot[1]
+
+    def _preview_size(self, shape):
+        """Preview dimensions for a frame shape, or None if no downscale is needed"""
+        cached_shape, dsize = self._preview_size_cache
+        if shape != cached_shape:
+            height, width = shape[:2]
+            scale = self.preview_max_width / width
+            dsize = (self.preview_max_width, int(height * scale)) if scale < 1 else None
+            self._preview_size_cache = (shape, dsize)
+        return dsize
+
+    def _encode_frame(self, frame) -> Optional[bytes]:
+        """Encode a frame for the web preview, logging instead of raising on errors"""
+        try:
+            dsize = self._preview_size(frame.shape)
+            if dsize is not None:
+                # Fewer pixels to encode and to send to every client
+                frame = cv2.resize(frame, dsize, interpolation=cv2.INTER_AREA)
+            return _encode_preview_jpeg(frame)
         except Exception as e:
             print(f"⚠️  Error encoding frame for monitoring: {e}")
+            return None
 
     def update_processing_time(self, processing_time: float):
         """Update processing time metrics
@@ -97,13 +267,13 @@ class MonitoringCollector:
         Args:
             processing_time: Time taken to process a frame in seconds
         """
-        with self._lock:
-            self._processing_times.append(processing_time)
-            self._total_frames_processed += 1
-            if processing_time > 0:
-                fps = 1.0 / processing_time
-                self._fps_history.append(fps)
-            self._frame_count += 1
+        self._processing_times.append(processing_time)
+        if processing_time > 0:
+            fps = 1.0 / processing_time
+            self._fps_history.append(fps)
+        self._publish_perf_snapshot()
+        self._total_frames_processed += 1
+        self._frame_count += 1
 
     def update_timing_breakdown(self, timing: Dict[str, float]):
         """Update detailed timing breakdown for the last frame
@@ -126,30 +296,31 @@ class MonitoringCollector:
                 - memory_cleanup: Time for memory cleanup (optional)
                 - unaccounted_time: Unaccounted time (optional)
         """
+        # Calculate unaccounted time if not provided
+        if 'unaccounted_time' not in timing and 'total' in timing:
+            accounted_time = sum([
+                timing.get('frame_read', 0.0),
+                timing.get('resize', 0.0),
+                timing.get('detection', 0.0),
+                timing.get('mqtt_publish', 0.0),
+                timing.get('db_queue_wait', 0.0),
+                timing.get('file_queue_wait', 0.0),
+                timing.get('timestamp_generation', 0.0),
+                timing.get('monitoring_update', 0.0),
+                timing.get('save_database_check', 0.0),
+                timing.get('detection_processing', 0.0),
+                timing.get('memory_cleanup', 0.0)
+            ])
+            timing['unaccounted_time'] = max(0.0, timing['total'] - accounted_time)
+        
+        self._timing_breakdown.update(timing)
+        # Track frame age if provided
+        if 'frame_age' in timing:
+            self._frame_age = timing['frame_age']
+            self._frame_age_history.append(timing['frame_age'])
+            self._publish_perf_snapshot()
+        
         with self._lock:
-            # Calculate unaccounted time if not provided
-            if 'unaccounted_time' not in timing and 'total' in timing:
-                accounted_time = sum([
-                    timing.get('frame_read', 0.0),
-                    timing.get('resize', 0.0),
-                    timing.get('detection', 0.0),
-                    timing.get('mqtt_publish', 0.0),
-                    timing.get('db_queue_wait', 0.0),
-                    timing.get('file_queue_wait', 0.0),
-                    timing.get('timestamp_generation', 0.0),
-                    timing.get('monitoring_update', 0.0),
-                    timing.get('save_database_check', 0.0),
-                    timing.get('detection_processing', 0.0),
-                    timing.get('memory_cleanup', 0.0)
-                ])
-                timing['unaccounted_time'] = max(0.0, timing['total'] - accounted_time)
-            
-            self._timing_breakdown.update(timing)
-            # Track frame age if provided
-            if 'frame_age' in timing:
-                self._frame_age = timing['frame_age']
-                self._frame_age_history.append(timing['frame_age'])
-            
             # Store timing history for profiling
             self._timing_history.append(timing.copy())
 
@@ -159,11 +330,23 @@ class MonitoringCollector:
         Args:
             frame_age: Age of the current frame in seconds (time between capture and now)
         """
-        with self._lock:
-            self._frame_age = frame_age
-            self._frame_age_history.append(frame_age)
-            # Also update timing breakdown
-            self._timing_breakdown['frame_age'] = frame_age
+        self._frame_age = frame_age
+        self._frame_age_history.append(frame_age)
+        self._publish_perf_snapshot()
+        # Also update timing breakdown
+        self._timing_breakdown.frame_age = frame_age
+
+    def _publish_perf_snapshot(self):
+        """Publish the current rolling statistics as one immutable tuple"""
+        self._perf_snapshot = (
+            self._fps_history.mean(),
+            self._fps_history.last(),
+            self._processing_times.mean(),
+            self._processing_times.min(),
+            self._processing_times.max(),
+            self._frame_age_history.mean(),
+            self._frame_age_history.max()
+        )
 
     def add_detection(self, class_name: str, confidence: float, bbox: List[float], 
                      timestamp: str, detection_time: float):
@@ -197,11 +380,7 @@ class MonitoringCollector:
             file_queue_size: Current size of file queue
             file_queue_wait: Average wait time in file queue
         """
-        with self._lock:
-            self._db_queue_size = db_queue_size
-            self._db_queue_wait_time = db_queue_wait
-            self._file_queue_size = file_queue_size
-            self._file_queue_wait_time = file_queue_wait
+        self._queue_status = (db_queue_size, db_queue_wait, file_queue_size, file_queue_wait)
 
     def set_streaming_status(self, is_streaming: bool):
         """Update streaming status
@@ -209,8 +388,7 @@ class MonitoringCollector:
         Args:
             is_streaming: Whether the stream is currently active
         """
-        with self._lock:
-            self._is_streaming = is_streaming
+        self._is_streaming = is_streaming
 
     def increment_frames_skipped(self, count: int = 1):
         """Increment the count of skipped frames
@@ -218,17 +396,26 @@ class MonitoringCollector:
         Args:
             count: Number of frames skipped
         """
-        with self._lock:
-            self._frames_skipped += count
+        self._frames_skipped += count
 
     def get_current_frame(self) -> Optional[bytes]:
         """Get the current frame as JPEG bytes (thread-safe)
         
+        Encodes the frame on first request and memoizes the result until the
+        next update_frame.
+        
         Returns:
             JPEG-encoded frame bytes or None
         """
-        with self._lock:
-            return self._current_frame_jpeg
+        frame = self._frame_slot[0]
+        encoded_frame, frame_jpeg = self._frame_jpeg
+        if frame is None or (encoded_frame is frame and frame_jpeg is not None):
+            return frame_jpeg
+
+        frame_jpeg = self._encode_frame(frame)
+        # A newer frame arriving meanwhile simply won't match this pair
+        self._frame_jpeg = (frame, frame_jpeg)
+        return frame_jpeg
 
     def get_metrics(self) -> Dict[str, Any]:
         """Get current performance metrics (thread-safe)
@@ -236,40 +423,24 @@ class MonitoringCollector:
         Returns:
             Dictionary with performance metrics
         """
-        with self._lock:
-            processing_times_list = list(self._processing_times)
-            fps_list = list(self._fps_history)
-            
-            avg_processing_time = (sum(processing_times_list) / len(processing_times_list) 
-                                 if processing_times_list else 0.0)
-            avg_fps = (sum(fps_list) / len(fps_list) 
-                      if fps_list else 0.0)
-            min_processing_time = min(processing_times_list) if processing_times_list else 0.0
-            max_processing_time = max(processing_times_list) if processing_times_list else 0.0
-            
-            uptime = time.time() - self._start_time
-            
-            # Calculate frame age statistics
-            frame_age_list = list(self._frame_age_history)
-            avg_frame_age = (sum(frame_age_list) / len(frame_age_list) 
-                           if frame_age_list else 0.0)
-            max_frame_age = max(frame_age_list) if frame_age_list else 0.0
-            
-            return {
-                'fps': avg_fps,
-                'current_fps': fps_list[-1] if fps_list else 0.0,
-                'avg_processing_time': avg_processing_time,
-                'min_processing_time': min_processing_time,
-                'max_processing_time': max_processing_time,
-                'total_frames_processed': self._total_frames_processed,
-                'frames_skipped': self._frames_skipped,
-                'uptime': uptime,
-                'is_streaming': self._is_streaming,
-                'last_frame_time': self._last_frame_time,
-                'frame_age': self._frame_age,
-                'avg_frame_age': avg_frame_age,
-                'max_frame_age': max_frame_age
-            }
+        # Lock-free: statistics are read from the last published snapshot
+        (avg_fps, current_fps, avg_processing_time, min_processing_time,
+         max_processing_time, avg_frame_age, max_frame_age) = self._perf_snapshot
+        return {
+            'fps': avg_fps,
+            'current_fps': current_fps,
+            'avg_processing_time': avg_processing_time,
+            'min_processing_time': min_processing_time,
+            'max_processing_time': max_processing_time,
+            'total_frames_processed': self._total_frames_processed,
+            'frames_skipped': self._frames_skipped,
+            'uptime': time.time() - self._start_time,
+            'is_streaming': self._is_streaming,
+            'last_frame_time': self._last_frame_time,
+            'frame_age': self._frame_age,
+            'avg_frame_age': avg_frame_age,
+            'max_frame_age': max_frame_age
+        }
 
     def get_detections(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent detections (thread-safe)
@@ -281,7 +452,15 @@ class MonitoringCollector:
             List of detection dictionaries
         """
         with self._lock:
-            return list(self._detections_history)[-limit:]
+            return self._recent_detections(limit)
+
+    def _recent_detections(self, limit: int) -> List[Dict[str, Any]]:
+        """Copy only the newest `limit` detections; the caller must hold self._lock"""
+        if limit <= 0:
+            return []
+        recent = list(islice(reversed(self._detections_history), limit))
+        recent.reverse()
+        return recent
 
     def get_queue_status(self) -> Dict[str, Any]:
         """Get current queue status (thread-safe)
@@ -289,17 +468,17 @@ class MonitoringCollector:
         Returns:
             Dictionary with queue status information
         """
-        with self._lock:
-            return {
-                'db_queue': {
-                    'size': self._db_queue_size,
-                    'wait_time': self._db_queue_wait_time
-                },
-                'file_queue': {
-                    'size': self._file_queue_size,
-                    'wait_time': self._file_queue_wait_time
-                }
+        db_size, db_wait, file_size, file_wait = self._queue_status
+        return {
+            'db_queue': {
+                'size': db_size,
+                'wait_time': db_wait
+            },
+            'file_queue': {
+                'size': file_size,
+                'wait_time': file_wait
             }
+        }
 
     def get_timing_breakdown(self) -> Dict[str, float]:
         """Get detailed timing breakdown (thread-safe)
@@ -307,8 +486,7 @@ class MonitoringCollector:
         Returns:
             Dictionary with timing components
         """
-        with self._lock:
-            return self._timing_breakdown.copy()
+        return self._timing_breakdown.as_dict()
 
     def get_timing_history(self, limit: int = 10) -> List[Dict[str, float]]:
         """Get historical timing breakdowns for profiling (thread-safe)
@@ -328,15 +506,14 @@ class MonitoringCollector:
         Returns:
             Dictionary with system status
         """
-        with self._lock:
-            return {
-                'is_streaming': self._is_streaming,
-                'uptime': time.time() - self._start_time,
-                'total_frames_processed': self._total_frames_processed,
-                'frames_skipped': self._frames_skipped,
-                'last_frame_time': self._last_frame_time,
-                'current_time': time.time()
-            }
+        return {
+            'is_streaming': self._is_streaming,
+            'uptime': time.time() - self._start_time,
+            'total_frames_processed': self._total_frames_processed,
+            'frames_skipped': self._frames_skipped,
+            'last_frame_time': self._last_frame_time,
+            'current_time': time.time()
+        }
 
     def get_all_data(self) -> Dict[str, Any]:
         """Get all monitoring data in one call (thread-safe)
@@ -344,10 +521,20 @@ class MonitoringCollector:
         Returns:
             Dictionary with all monitoring data
         """
+        return self._snapshot_locked()
+
+    def _snapshot_locked(self) -> Dict[str, Any]:
+        """Build the get_all_data snapshot under a single lock acquisition
+
+        Only the detection history needs the lock; everything else is read
+        from published snapshots.
+        """
+        with self._lock:
+            detections = self._recent_detections(20)
         return {
             'status': self.get_status(),
             'metrics': self.get_metrics(),
-            'detections': self.get_detections(limit=20),
+            'detections': detections,
             'queues': self.get_queue_status(),
             'timing': self.get_timing_breakdown(),
             'timestamp': time.time()
@@ -1,12 +1,14 @@
 """FastAPI-based monitoring server for real-time debugging"""
 
 import asyncio
-import json
 import threading
 from typing import Set
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
-from fastapi.responses import Response, FileResponse
+import cv2
+import numpy as np
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, FileResponse, JSONResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 import uvicorn
 import sys
 import os
@@ -15,11 +17,17 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from cat_detector.monitoring_collector import MonitoringCollector
+from cat_detector import json_utils
+
+# ORJSONResponse needs orjson installed
+DefaultResponse = ORJSONResponse if json_utils.orjson is not None else JSONResponse
 
 
 class MonitoringServer:
     """FastAPI server for real-time monitoring"""
 
+    FULL_UPDATE_INTERVAL = 10.0  # seconds between full snapshots in the broadcast
+
     def __init__(self, collector: MonitoringCollector, port: int = 8080):
         """Initialize the monitoring server
         
@@ -29,16 +37,27 @@ class MonitoringServer:
         """
         self.collector = collector
         self.port = port
-        self.app = FastAPI(title="Katzenschreck Monitoring", version="1.0.0")
+        self.app = FastAPI(title="Katzenschreck Monitoring", version="1.0.0",
+                           default_response_class=DefaultResponse)
         self.websocket_clients: Set[WebSocket] = set()
+        # Shown by the dashboard while no camera frame is available
+        self._placeholder_jpeg = self._create_placeholder_jpeg()
         self._setup_routes()
         self._broadcast_task = None
+        # Last broadcast snapshot, deltas are computed against it
+        self._last_broadcast = None
+        self._last_full_broadcast = 0.0
         self._server_thread = None
         self._running = False
 
     def _setup_routes(self):
         """Setup all API routes"""
         
+        @self.app.on_event("startup")
+        async def start_broadcast():
+            """Start pushing updates to dashboards once the event loop runs"""
+            self._broadcast_task = asyncio.create_task(self._broadcast_updates())
+
         @self.app.get("/api/status")
         async def get_status():
             """Get system status"""
@@ -72,9 +91,12 @@ class MonitoringServer:
         @self.app.get("/api/frame")
         async def get_frame():
             """Get current frame as JPEG"""
-            frame_jpeg = self.collector.get_current_frame()
+            # May encode on demand; keep the event loop free for WebSocket updates
+            frame_jpeg = await run_in_threadpool(self.collector.get_current_frame)
             if frame_jpeg is None:
-                raise HTTPException(status_code=404, detail="No frame available")
+                # Still an error status for API clients, but an image for <img>
+                return Response(content=self._placeholder_jpeg, media_type="image/jpeg",
+                                status_code=503)
             return Response(content=frame_jpeg, media_type="image/jpeg")
 
         @self.app.get("/api/all")
@@ -87,14 +109,15 @@ class MonitoringServer:
             """WebSocket endpoint for real-time updates"""
             await websocket.accept()
             self.websocket_clients.add(websocket)
+            self._update_encode_mode()
             try:
                 # Send initial data
                 data = self.collector.get_all_data()
-                await websocket.send_json({
+                await websocket.send_bytes(json_utils.dumps({
                     "type": "update",
                     "timestamp": data["timestamp"],
                     "data": data
-                })
+                }))
                 
                 # Keep connection alive and wait for disconnect
                 while True:
@@ -104,15 +127,16 @@ class MonitoringServer:
                     except asyncio.TimeoutError:
                         # Send periodic update
                         data = self.collector.get_all_data()
-                        await websocket.send_json({
+                        await websocket.send_bytes(json_utils.dumps({
                             "type": "update",
                             "timestamp": data["timestamp"],
                             "data": data
-                        })
+                        }))
             except WebSocketDisconnect:
                 pass
             finally:
                 self.websocket_clients.discard(websocket)
+                self._update_encode_mode()
 
         # Serve static files if directory exists
         static_dir = os.path.join(os.path.dirname(__file__), "monitoring", "static")
@@ -127,34 +151,81 @@ class MonitoringServer:
                     return FileResponse(index_path)
                 return {"message": "Monitoring dashboard not found"}
 
+    @staticmethod
+    def _create_placeholder_jpeg() -> bytes:
+        """Render the "Waiting for camera stream..." placeholder once as JPEG"""
+        placeholder = np.zeros((480, 640, 3), dtype=np.uint8)
+        cv2.putText(placeholder, "Waiting for camera stream...", (95, 245),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.9, (200, 200, 200), 2, cv2.LINE_AA)
+        _, buffer = cv2.imencode('.jpg', placeholder, [int(cv2.IMWRITE_JPEG_QUALITY), 75])
+        return buffer.tobytes()
+
+    def _update_encode_mode(self):
+        """Encode every frame eagerly only while a dashboard is connected
+
+        Without connected clients, /api/frame still works: the collector then
+        encodes the latest frame on demand.
+        """
+        self.collector.set_encode_enabled(bool(self.websocket_clients))
+
     async def _broadcast_updates(self):
         """Background task to broadcast updates to all WebSocket clients"""
         while self._running:
             try:
                 if self.websocket_clients:
-                    data = self.collector.get_all_data()
-                    message = {
-                        "type": "update",
-                        "timestamp": data["timestamp"],
-                        "data": data
-                    }
-                    # Send to all connected clients
-                    disconnected = set()
-                    for client in self.websocket_clients:
-                        try:
-                            await client.send_json(message)
-                        except Exception:
-                            disconnected.add(client)
+                    message = json_utils.dumps(self._next_broadcast_message())
+                    # Send the same serialized payload to all clients concurrently
+                    clients = list(self.websocket_clients)
+                    results = await asyncio.gather(
+                        *(client.send_bytes(message) for client in clients),
+                        return_exceptions=True
+                    )
                     
                     # Remove disconnected clients
+                    disconnected = [client for client, result in zip(clients, results)
+                                    if isinstance(result, Exception)]
                     for client in disconnected:
                         self.websocket_clients.discard(client)
+                    if disconnected:
+                        self._update_encode_mode()
+                else:
+                    # Start over with a full snapshot once clients are back
+                    self._last_broadcast = None
                 
                 await asyncio.sleep(0.5)  # Update every 500ms
             except Exception as e:
                 print(f"⚠️  Error in broadcast task: {e}")
                 await asyncio.sleep(1)
 
+    def _next_broadcast_message(self) -> dict:
+        """Build the next broadcast: a full snapshot every FULL_UPDATE_INTERVAL
+        seconds, otherwise only the fields and detections that changed
+
+        Newly connected clients get a full snapshot from the WebSocket endpoint,
+        so they can apply deltas right away.
+        """
+        data = self.collector.get_all_data()
+        now = data["timestamp"]
+        previous = self._last_broadcast
+        self._last_broadcast = data
+        if previous is None or now - self._last_full_broadcast >= self.FULL_UPDATE_INTERVAL:
+            self._last_full_broadcast = now
+            return {"type": "update", "timestamp": now, "data": data}
+
+        changes = {}
+        for section in ('status', 'metrics', 'queues', 'timing'):
+            old = previous[section]
+            changed = {key: value for key, value in data[section].items()
+                       if old.get(key) != value}
+            if changed:
+                changes[section] = changed
+        last_seen = max((detection['recorded_at'] for detection in previous['detections']),
+                        default=0.0)
+        new_detections = [detection for detection in data['detections']
+                          if detection['recorded_at'] > last_seen]
+        return {"type": "delta", "timestamp": now, "changes": changes,
+                "detections": new_detections}
+
     def _run_server(self):
         """Run the uvicorn server in a separate thread"""
         config = uvicorn.Config(
@@ -1,8 +1,10 @@
 """MQTT communication handler for the cat deterrent system"""
 
 import time
-import json
+import logging
+import queue
 import threading
+from collections import deque
 import paho.mqtt.client as mqtt
 import sys
 import os
@@ -11,36 +13,65 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from cat_detector.config import Config
+from cat_detector import json_utils
+
+logger = logging.getLogger(__name__)
 
 
 class MQTTHandler:  # pylint: disable=too-few-public-methods
-    """MQTT handler for communication with MQTT broker with auto-reconnect"""
+    """MQTT handler for communication with MQTT broker with auto-reconnect
+
+    publish_detection only enqueues the message; a background publisher thread
+    hands it to the client, so the detection loop never waits on the network.
+    The same thread publishes the <topic>/ping heartbeat once nothing else was
+    published for HEARTBEAT_INTERVAL, while paho's keepalive keeps the
+    connection itself alive.
+    """
+
+    # Detection payload; "time" and "class" only ever contain characters that
+    # need no JSON escaping (generated timestamp, fixed class names)
+    DETECTION_TEMPLATE = '{{"time":"{}","class":"{}","confidence":{!r}}}'
 
-    def __init__(self, config: Config):
+    KEEPALIVE = 30  # seconds, MQTT PINGREQ interval handled by paho
+    HEARTBEAT_INTERVAL = 30  # idle seconds before a <topic>/ping message
+
+    def __init__(self, config: Config, max_queue_size: int = 256, max_offline_messages: int = 256):
         self.config = config
         self.client = None
         self.connected = False
-        self.ping_thread = None
+        self.publisher_thread = None
+        # Pending (topic, payload, (class_name, confidence)) messages and how many were dropped
+        self._publish_queue = queue.Queue(maxsize=max_queue_size)
+        self.dropped_messages = 0
+        # Messages held back while disconnected (oldest dropped when full),
+        # sent once the connection is back
+        self._offline_messages = deque(maxlen=max_offline_messages)
+        # Detection topic per class name, built on first use
+        self._topics = {}
         self._setup_client()
         self._start_connection()
-        self._start_ping_thread()
+        self._start_publisher_thread()
 
     def _on_connect(self, client, userdata, flags, rc):
         """Callback when client connects to broker"""
         if rc == 0:
-            print("✅ MQTT: Successfully connected to broker")
+            logger.info("✅ MQTT: Successfully connected to broker")
             self.connected = True
+            if self._offline_messages:
+                logger.info("📤 MQTT: Sending %d message(s) held back while disconnected",
+                            len(self._offline_messages))
+                self._flush_offline_messages()
         else:
-            print(f"❌ MQTT: Connection failed with code {rc}")
+            logger.error("❌ MQTT: Connection failed with code %s", rc)
             self.connected = False
 
     def _on_disconnect(self, client, userdata, rc):
         """Callback when client disconnects from broker"""
         self.connected = False
         if rc != 0:
-            print(f"⚠️  MQTT: Unexpected disconnect (code {rc}). Will auto-reconnect...")
+            logger.warning("⚠️  MQTT: Unexpected disconnect (code %s). Will auto-reconnect...", rc)
         else:
-            print("MQTT: Disconnected from broker")
+            logger.info("MQTT: Disconnected from broker")
 
     def _setup_client(self):
         """Sets up the persistent MQTT client with auto-reconnect"""
@@ -57,66 +88,151 @@ class MQTTHandler:  # pylint: disable=too-few-public-methods
         self.client.reconnect_delay_set(min_delay=1, max_delay=120)
 
     def _start_connection(self):
-        """Starts the initial connection to broker"""
+        """Starts the initial connection to broker
+
+        The connection is established by the network loop thread, so startup
+        never blocks on DNS or the TCP/MQTT handshake and a broker that is down
+        at startup is retried like any later disconnect.
+        """
         try:
-            self.client.connect(self.config.mqtt_broker_url,
-                              self.config.mqtt_broker_port, 60)
-            # Start network loop in background thread
-            self.client.loop_start()
-            print(f"🔌 MQTT: Connecting to {self.config.mqtt_broker_url}:{self.config.mqtt_broker_port}...")
-        except (mqtt.MQTTException, ConnectionError, OSError) as e:
-            print(f"⚠️  MQTT: Initial connection failed: {e}. Will retry automatically...")
-            # Start loop anyway - it will keep trying to reconnect
-            self.client.loop_start()
-
-    def _start_ping_thread(self):
-        """Starts the MQTT ping thread"""
-        self.ping_thread = threading.Thread(target=self._mqtt_ping)
-        self.ping_thread.daemon = True
-        self.ping_thread.start()
-
-    def _mqtt_ping(self):
-        """Sends a ping to the MQTT broker every 30 seconds"""
+            self.client.connect_async(self.config.mqtt_broker_url,
+                                      self.config.mqtt_broker_port, self.KEEPALIVE)
+            logger.info("🔌 MQTT: Connecting to %s:%s...",
+                        self.config.mqtt_broker_url, self.config.mqtt_broker_port)
+        except (mqtt.MQTTException, ValueError) as e:
+            logger.warning("⚠️  MQTT: Invalid connection settings: %s", e)
+        # Start network loop in background thread - it keeps trying to reconnect
+        self.client.loop_start()
+
+    def _start_publisher_thread(self):
+        """Starts the background thread that publishes queued messages"""
+        self.publisher_thread = threading.Thread(target=self._publish_loop)
+        self.publisher_thread.daemon = True
+        self.publisher_thread.start()
+
+    def _publish_loop(self):
+        """Publishes queued messages in order and the heartbeat when idle"""
+        next_heartbeat = time.monotonic() + self.HEARTBEAT_INTERVAL
         while True:
-            time.sleep(30)
+            timeout = next_heartbeat - time.monotonic()
+            if timeout <= 0:
+                self._publish_heartbeat()
+                next_heartbeat = time.monotonic() + self.HEARTBEAT_INTERVAL
+                continue
+            try:
+                item = self._publish_queue.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            if item is None:  # Sentinel from disconnect(), the queue is drained
+                return
+            if self._publish_message(*item):
+                # Any published message already shows we are alive
+                next_heartbeat = time.monotonic() + self.HEARTBEAT_INTERVAL
+
+    def _publish_message(self, topic: str, message, description: tuple) -> bool:
+        """Publishes one message, holding it back if the client is disconnected
+
+        Returns:
+            True if the message was handed to the connected client
+        """
+        if not self.connected:
+            # paho drops QoS 0 messages while disconnected, keep it for _on_connect
+            self._offline_messages.append((topic, message, description))
             if self.connected:
-                try:
-                    extended_topic = f'{self.config.mqtt_topic}/ping'
-                    current_timestamp = int(time.time())
-                    self.client.publish(extended_topic,
-                                      json.dumps({"timestamp": current_timestamp}))
-                except Exception as e:
-                    print(f"⚠️  MQTT Ping Error: {e}")
+                # Reconnected meanwhile: _on_connect may have flushed already
+                self._flush_offline_messages()
+            return False
+        rc = self._send(topic, message, description)
+        if rc == mqtt.MQTT_ERR_NO_CONN:
+            self._offline_messages.append((topic, message, description))
+        return rc == mqtt.MQTT_ERR_SUCCESS
+
+    def _send(self, topic: str, message, description: tuple):
+        """Hands one message to the client
+
+        Returns:
+            paho result code, or None if publishing raised; on MQTT_ERR_NO_CONN
+            the message was not sent and the caller keeps it
+        """
+        try:
+            # QoS 0 for fire and forget (no delivery guarantee)
+            result = self.client.publish(topic, message, qos=0)
+        except Exception as e:
+            logger.warning("⚠️  MQTT Publish Error: %s", e)
+            return None
+        if result.rc == mqtt.MQTT_ERR_SUCCESS:
+            logger.debug("📤 MQTT: Detection published (%s, %.2f)", *description)
+        elif result.rc != mqtt.MQTT_ERR_NO_CONN:  # NO_CONN: dropped before _on_disconnect ran
+            logger.warning("⚠️  MQTT: Publish failed with code %s", result.rc)
+        return result.rc
+
+    def _flush_offline_messages(self):
+        """Publishes the messages held back while disconnected, oldest first"""
+        while self.connected:
+            try:
+                item = self._offline_messages.popleft()
+            except IndexError:
+                return
+            if self._send(*item) == mqtt.MQTT_ERR_NO_CONN:
+                # Keep it first in line and stop: this may run on paho's network
+                # thread, where _on_disconnect cannot clear self.connected meanwhile
+                self._offline_messages.appendleft(item)
+                return
+
+    def _publish_heartbeat(self):
+        """Publishes the application-level heartbeat to <topic>/ping"""
+        if self.connected:
+            try:
+                extended_topic = f'{self.config.mqtt_topic}/ping'
+                current_timestamp = int(time.time())
+                self.client.publish(extended_topic,
+                                  json_utils.dumps({"timestamp": current_timestamp}))
+            except Exception as e:
+                logger.warning("⚠️  MQTT Ping Error: %s", e)
 
     def publish_detection(self, class_name: str, confidence: float,
                          timestamp: str):
-        """Sends a detection message to the MQTT broker"""
+        """Queues a detection message for the MQTT broker (non-blocking)"""
         if not self.connected:
-            print("⚠️  MQTT: Not connected. Message queued for when connection is restored.")
+            logger.warning("⚠️  MQTT: Not connected. Message queued for when connection is restored.")
         
+        extended_topic = self._topics.get(class_name)
+        if extended_topic is None:
+            extended_topic = self._topics[class_name] = f'{self.config.mqtt_topic}/{class_name}'
+        message = self.DETECTION_TEMPLATE.format(timestamp, class_name, float(confidence))
+        # (class_name, confidence) is formatted only if the publish is logged (debug)
+        item = (extended_topic, message, (class_name, confidence))
         try:
-            extended_topic = f'{self.config.mqtt_topic}/{class_name}'
-            message = json.dumps({
-                "time": timestamp,
-                "class": class_name,
-                "confidence": confidence
-            })
-            # QoS 0 for fire and forget (no delivery guarantee)
-            result = self.client.publish(extended_topic, message, qos=0)
-            
-            # Check if message was queued successfully
-            if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                if self.connected:
-                    print(f"📤 MQTT: Detection published ({class_name}, {confidence:.2f})")
-            else:
-                print(f"⚠️  MQTT: Publish failed with code {result.rc}")
-                
-        except Exception as e:
-            print(f"⚠️  MQTT Publish Error: {e}")
+            self._publish_queue.put_nowait(item)
+        except queue.Full:
+            # Drop the oldest message: the latest detection matters most for the alarm
+            try:
+                self._publish_queue.get_nowait()
+                self.dropped_messages += 1
+            except queue.Empty:
+                pass  # The publisher emptied the queue meanwhile
+            try:
+                self._publish_queue.put_nowait(item)
+            except queue.Full:
+                self.dropped_messages += 1
+            logger.warning("⚠️  MQTT: Publish queue full, dropped oldest detection message "
+                           "(%d dropped so far)", self.dropped_messages)
+
+    def disconnect(self, timeout: float = 5.0):
+        """Gracefully disconnect from broker after publishing the queued messages
 
-    def disconnect(self):
-        """Gracefully disconnect from broker"""
+        Args:
+            timeout: Seconds to wait for the publisher thread to drain the queue
+        """
+        try:
+            self._publish_queue.put(None, timeout=timeout)
+            self.publisher_thread.join(timeout)
+        except queue.Full:
+            logger.warning("⚠️  MQTT: Publish queue not drained, %d message(s) lost",
+                           self._publish_queue.qsize())
         if self.client:
-            self.client.loop_stop()
+            # Disconnect while the network loop still runs, so it sends the
+            # messages paho has buffered before the DISCONNECT packet
             self.client.disconnect()
-            print("MQTT: Disconnected")
+            self.client.loop_stop()
+            logger.info("MQTT: Disconnected")
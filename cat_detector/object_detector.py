@@ -1,10 +1,42 @@
 """Object detection using YOLO for cat detection"""
 
 import os
+import shutil
 from typing import Optional, List, Tuple
+import cv2
+import numpy as np
+import torch
 from ultralytics import YOLO
 from .hardware_detector import HardwareDetector
 
+# Relative model paths (e.g. runs/train15/weights/best.pt) are also looked up here
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Compiled TensorRT engines survive restarts here (building one takes minutes)
+ENGINE_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'katzenschreck')
+JETSON_IMGSZ = 640
+DEFAULT_IMGSZ = 1280
+
+
+def _tensorrt_engine_path(model_path: str, imgsz: int, half: bool) -> Optional[str]:
+    """Cache path of the TensorRT engine for a model, or None if TensorRT is missing
+
+    The name includes the TensorRT version, input size, precision and the model
+    file's modification time, so upgrades and retrained weights get a fresh engine.
+    The model file must exist (None otherwise), so the name is the same on every run.
+    """
+    try:
+        import tensorrt  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    try:
+        mtime = int(os.path.getmtime(model_path))
+    except OSError:
+        return None
+    name = f"{os.path.splitext(os.path.basename(model_path))[0]}_{mtime}"
+    return os.path.join(ENGINE_CACHE_DIR,
+                        f"{name}_trt{tensorrt.__version__}_{imgsz}_{'fp16' if half else 'fp32'}.engine")
+
 
 class ObjectDetector:
     """YOLO object detection class with automatic hardware detection"""
@@ -12,91 +44,235 @@ class ObjectDetector:
     CLASS_NAMES = {0: 'Person', 15: 'Cat'}
     TARGET_CLASS_IDS = [0, 15]  # Person and Cat
 
-    def __init__(self, model_path: Optional[str] = None, hardware_type: Optional[str] = None):
+    MOTION_THUMBNAIL_SIZE = (64, 64)
+
+    # CPU threads for PyTorch when inference runs on the GPU (only pre- and
+    # post-processing run on the CPU then)
+    GPU_TORCH_THREADS = 2
+
+    def __init__(self, model_path: Optional[str] = None, hardware_type: Optional[str] = None,
+                 motion_threshold: float = 0.0, precision: str = 'auto',  # pylint: disable=too-many-arguments
+                 imgsz: Optional[int] = None):
+        """Initialize the detector
+
+        Args:
+            model_path: YOLO model file, auto-selected for the hardware if None
+            hardware_type: Hardware type override (jetson, raspberry_pi, generic)
+            motion_threshold: Mean absolute grayscale difference (0-255) below which
+                a frame counts as unchanged and detection is skipped; 0 disables it
+            precision: Inference precision: 'fp16', 'fp32' or 'auto' (FP16 on Jetson,
+                FP32 elsewhere); FP16 needs a GPU
+            imgsz: Detection input size in pixels (longest side, multiple of 32);
+                None uses 640 on Jetson and 1280 elsewhere
+        """
+        # Motion gate state: thumbnail of the last frame that went through YOLO
+        self.motion_threshold = motion_threshold
+        self._prev_thumb = None
+        # (frame shape, 1/width, 1/height) for the ignore zone tests; the camera
+        # resolution rarely changes, so the divisions are done once per shape
+        self._inverse_size = (None, 0.0, 0.0)
+
         # Detect hardware type for optimization (reused for model selection and inference params)
         hardware_detector = HardwareDetector(forced_type=hardware_type)
         self.is_jetson = hardware_detector.is_jetson
+        # Inference runs on a CUDA device (ultralytics picks it up automatically)
+        self.uses_gpu = self.is_jetson or torch.cuda.is_available()
+        # FP16 halves the memory traffic of inference; CPUs have no fast FP16 path
+        self.half = self.is_jetson if precision == 'auto' else precision == 'fp16'
+        if self.half and not self.uses_gpu:
+            print("⚠️  FP16 inference needs a GPU, using FP32")
+            self.half = False
+        if self.uses_gpu:
+            # A full-size intra-op pool only competes with OpenCV and the stream
+            # reader; on the CPU, inference keeps all cores
+            torch.set_num_threads(self.GPU_TORCH_THREADS)
         
         # Auto-detect optimal model if not specified
         if model_path is None:
-            model_path, requirements_file = hardware_detector.get_optimal_model()
+            model_path, requirements_file = hardware_detector.optimal_model
             print(f"🤖 Auto-detected optimal model: {model_path}")
             print(f"📋 Using requirements: {requirements_file}")
         
         # Resolve relative paths (e.g., runs/train15/weights/best.pt)
         if not os.path.isabs(model_path) and not os.path.exists(model_path):
             # Try relative to project root
-            project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            absolute_path = os.path.join(project_root, model_path)
+            absolute_path = os.path.join(_PROJECT_ROOT, model_path)
             if os.path.exists(absolute_path):
                 model_path = absolute_path
         
-        self.model = YOLO(model_path)
+        # YOLO letterboxes each frame to this size and maps the boxes back to the
+        # frame, so a smaller size speeds up inference without touching saved frames
+        if imgsz:
+            self.imgsz = max(32, round(imgsz / 32) * 32)
+        else:
+            self.imgsz = JETSON_IMGSZ if self.is_jetson else DEFAULT_IMGSZ
+        
+        # On Jetson, run a TensorRT engine if one can be built or loaded
+        self.model = (self._load_tensorrt_engine(model_path, self.half, self.imgsz)
+                      if self.is_jetson else None)
+        self.uses_engine = self.model is not None
+        if not self.uses_engine:
+            self.model = YOLO(model_path)
         
         # Set memory-efficient parameters for Jetson
         if self.is_jetson:
             print("🔧 Optimizing YOLO for Jetson (reduced memory usage)")
-            # Use smaller image size and FP16 for Jetson to reduce memory usage
+            # Use smaller image size for Jetson to reduce memory usage
             self.inference_params = {
-                'imgsz': 640,  # Reduced from default to save memory
-                'half': True,   # Use FP16 precision on Jetson
+                'imgsz': self.imgsz,  # Reduced from default to save memory
                 'device': 0,   # Use GPU
                 'verbose': False
             }
         else:
             self.inference_params = {
-                'imgsz': 1280,  # Standard size for other hardware
+                'imgsz': self.imgsz,  # Standard size for other hardware
                 'verbose': False
             }
+        if self.half and not self.uses_engine:
+            self.inference_params['half'] = True  # FP16 (baked into the engine otherwise)
+        # Let NMS drop other classes, and get results from a generator instead
+        # of a list built inside ultralytics
+        self.inference_params['classes'] = self.TARGET_CLASS_IDS
+        self.inference_params['stream'] = True
+
+    @staticmethod
+    def _load_tensorrt_engine(model_path: str, half: bool, imgsz: int):
+        """Loads the cached TensorRT engine for the model, exporting it on first use
+
+        Args:
+            model_path: PyTorch model to export
+            half: Build an FP16 engine instead of FP32
+            imgsz: Input size the engine is built for
+
+        Returns:
+            YOLO model backed by the engine, or None to fall back to PyTorch
+        """
+        if model_path.endswith('.engine'):
+            return None  # Already an engine, loaded as configured
+
+        try:
+            if not os.path.exists(model_path):
+                # Download release weights before naming the engine, else the
+                # first run's name lacks the file's mtime and the next run re-exports
+                from ultralytics.utils.downloads import attempt_download_asset  # pylint: disable=import-outside-toplevel
+                model_path = str(attempt_download_asset(model_path))
+            engine_path = _tensorrt_engine_path(model_path, imgsz, half)
+            if engine_path is None:
+                return None
+            if not os.path.exists(engine_path):
+                print(f"🔧 Exporting model to TensorRT {'FP16' if half else 'FP32'} engine "
+                      "(one-time, this can take several minutes)...")
+                exported_path = YOLO(model_path).export(
+                    format='engine', half=half, imgsz=imgsz, workspace=4, device=0)
+                os.makedirs(ENGINE_CACHE_DIR, exist_ok=True)
+                shutil.move(exported_path, engine_path)
+            print(f"🚀 Using TensorRT engine: {engine_path}")
+            return YOLO(engine_path, task='detect')
+        except Exception as e:  # pylint: disable=broad-except
+            print(f"⚠️  TensorRT engine unavailable ({e}), using PyTorch model")
+            return None
 
     def detect_objects(self, frame) -> Tuple[List[Tuple[int, float, List[float]]],
                                             object]:
-        """Detects objects in frame and returns relevant detections"""
-        # Use memory-efficient parameters, especially for Jetson
-        results = self.model(frame, **self.inference_params)
-        detections = []
+        """Detects objects in frame and returns relevant detections
 
-        for result in results:
-            for box in result.boxes:
-                class_id = int(box.cls.item())
+        Returns ([], None) without running the model if the motion gate finds
+        the frame unchanged.
+        """
+        if self.motion_threshold > 0 and not self._has_motion(frame):
+            return [], None
 
-                # Detect both persons and cats
-                if class_id in self.TARGET_CLASS_IDS:
-                    confidence = box.conf.item()
-                    bbox = box.xyxy[0].tolist()  # [x1, y1, x2, y2]
-                    detections.append((class_id, confidence, bbox))
+        # Use memory-efficient parameters, especially for Jetson; the results
+        # are kept for drawing, so the generator is consumed into a list
+        results = list(self.model.predict(frame, **self.inference_params))
+        detections = []
+        for result in results:
+            detections.extend(self._extract_detections(result))
 
         return detections, results
 
-    def is_in_ignore_zone(self, bbox: List[float], frame_shape: Tuple[int, int],
-                          ignore_zone: Optional[List[float]]) -> bool:
-        """Checks if the bounding box is in the ignore zone"""
-        if not ignore_zone:
-            return False
+    def detect_batch(self, frames: list) -> List[Tuple[List[Tuple[int, float, List[float]]],
+                                                      list]]:
+        """Detects objects in several frames with one batched forward pass
 
-        x1, y1, x2, y2 = bbox
-        frame_h, frame_w = frame_shape[:2]
+        Batching amortizes per-call overhead and keeps the GPU busier than
+        single-frame inference. The motion gate is not applied here. TensorRT
+        engines are exported with a fixed batch size of 1, so with an engine
+        the frames are run one after another.
 
-        # Box coordinates as percentage values
-        box_coords = self._get_box_percentage_coords(x1, y1, x2, y2, frame_w, frame_h)
+        Args:
+            frames: List of frames (numpy arrays)
 
-        # Ignore zone coordinates
-        iz_xmin, iz_ymin, iz_xmax, iz_ymax = ignore_zone
+        Returns:
+            One (detections, results) pair per frame, in input order, shaped like
+            the return value of detect_objects
+        """
+        if not frames:
+            return []
+        if self.uses_engine:
+            results = [result for frame in frames
+                       for result in self.model.predict(frame, **self.inference_params)]
+        else:
+            results = self.model.predict(frames, **self.inference_params)
+        return [(self._extract_detections(result), [result]) for result in results]
+
+    def _extract_detections(self, result) -> List[Tuple[int, float, List[float]]]:
+        """Returns (class_id, confidence, bbox) for each box in one result
+
+        Only persons and cats are left, NMS already dropped the other classes.
+        """
+        # One device-to-host copy per tensor instead of a sync per box value
+        boxes = result.boxes
+        class_ids = boxes.cls.cpu().numpy().astype(np.int32)
+        confidences = boxes.conf.cpu().numpy()
+        xyxy = boxes.xyxy.cpu().numpy()
 
-        # Check if box overlaps with ignore zone
-        return self._check_box_overlap(box_coords, (iz_xmin, iz_ymin, iz_xmax, iz_ymax))
+        return [(int(class_id), float(confidence), bbox)  # bbox: [x1, y1, x2, y2]
+                for class_id, confidence, bbox in zip(class_ids, confidences, xyxy.tolist())]
 
-    def _get_box_percentage_coords(self, x1, y1, x2, y2, frame_w, frame_h):
-        """Convert box coordinates to percentage values"""
-        return {
-            'xmin': x1 / frame_w,
-            'ymin': y1 / frame_h,
-            'xmax': x2 / frame_w,
-            'ymax': y2 / frame_h
-        }
+    def _inverse_frame_size(self, frame_shape) -> Tuple[float, float]:
+        """Returns (1/width, 1/height) for the frame shape, cached per shape"""
+        shape, inv_w, inv_h = self._inverse_size
+        if frame_shape != shape:
+            frame_h, frame_w = frame_shape[:2]
+            inv_w, inv_h = 1.0 / frame_w, 1.0 / frame_h
+            self._inverse_size = (frame_shape, inv_w, inv_h)
+        return inv_w, inv_h
 
-    def _check_box_overlap(self, box_coords, ignore_zone):
-        """Check if box overlaps with ignore zone"""
+    def _has_motion(self, frame) -> bool:
+        """Compares a small grayscale thumbnail against the last analyzed frame"""
+        thumb = cv2.cvtColor(cv2.resize(frame, self.MOTION_THUMBNAIL_SIZE,
+                                        interpolation=cv2.INTER_AREA),
+                             cv2.COLOR_BGR2GRAY)
+        if (self._prev_thumb is not None and
+                cv2.mean(cv2.absdiff(thumb, self._prev_thumb))[0] < self.motion_threshold):
+            return False
+        # Compare against the last analyzed frame, so slow changes still add up
+        self._prev_thumb = thumb
+        return True
+
+    def ignore_mask(self, xyxy, frame_shape: Tuple[int, int],
+                    ignore_zone: Optional[List[float]]):
+        """Checks all bounding boxes against the ignore zone at once
+
+        Works on a NumPy array or a torch tensor (on any device) without
+        per-box Python calls.
+
+        Args:
+            xyxy: (N, 4) boxes as [x1, y1, x2, y2] in pixels
+            frame_shape: Shape of the frame the boxes refer to
+            ignore_zone: [xmin, ymin, xmax, ymax] as fractions of the frame, or None
+
+        Returns:
+            Boolean mask of length N (same array type as xyxy), True for boxes
+            that overlap the ignore zone
+        """
+        if not ignore_zone:
+            return xyxy[:, 0] < float('-inf')  # Nothing is ignored
+
+        inv_w, inv_h = self._inverse_frame_size(frame_shape)
         iz_xmin, iz_ymin, iz_xmax, iz_ymax = ignore_zone
-        return not (box_coords['xmax'] < iz_xmin or box_coords['xmin'] > iz_xmax or
-                   box_coords['ymax'] < iz_ymin or box_coords['ymin'] > iz_ymax)
+
+        # Overlap test on percentage coordinates of all boxes
+        return ~((xyxy[:, 2] * inv_w < iz_xmin) | (xyxy[:, 0] * inv_w > iz_xmax) |
+                 (xyxy[:, 3] * inv_h < iz_ymin) | (xyxy[:, 1] * inv_h > iz_ymax))
@@ -1,5 +1,6 @@
 """Results folder cleanup utility for disk space management"""
 
+import heapq
 import os
 import shutil
 
@@ -19,28 +20,37 @@ def cleanup_results_folder(results_folder, usage_threshold):
         if not os.path.exists(results_folder):
             return  # Directory doesn't exist, nothing to delete
 
-        # All image files in results_folder (only .jpg)
+        # Bytes that have to go to get back below the threshold
+        bytes_to_free = used - usage_threshold * total
+
+        # All image files in results_folder (only .jpg) with their creation
+        # time and size; scandir caches the stat result, so each file is
+        # stat'ed once
         try:
-            images = [os.path.join(results_folder, f)
-                     for f in os.listdir(results_folder)
-                     if f.lower().endswith('.jpg')]
+            with os.scandir(results_folder) as entries:
+                images = []
+                for entry in entries:
+                    if entry.name.lower().endswith('.jpg'):
+                        stat = entry.stat()
+                        images.append((stat.st_ctime, entry.path, stat.st_size))
         except OSError:
             return  # Error reading directory
 
         if not images:
             return  # No images present
 
-        # Sort by creation time (oldest first)
-        images.sort(key=os.path.getctime)
+        # Min-heap by creation time: usually only a few of the oldest images
+        # have to go, so pop them instead of sorting the whole folder
+        heapq.heapify(images)
 
-        # Delete until usage is below threshold or no images left
-        for img in images:
+        # Delete until the freed bytes bring usage below the threshold or no
+        # images are left; counting sizes avoids a disk_usage call per file
+        freed = 0
+        while images and freed < bytes_to_free:
+            _, img, size = heapq.heappop(images)
             try:
                 os.remove(img)
-                total, used, _ = shutil.disk_usage("/")
-                usage = used / total
-                if usage < usage_threshold:
-                    break
+                freed += size
             except OSError:
                 continue  # Error deleting, skip this file
 
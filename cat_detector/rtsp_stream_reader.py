@@ -1,11 +1,102 @@
 """Threaded RTSP stream reader with buffer cleansing to prevent frame drift"""
 
 import cv2
+import logging
 import threading
 import time
 import os
+from collections import deque
 from typing import Optional, Tuple
 
+logger = logging.getLogger(__name__)
+
+
+def _opencv_has_gstreamer() -> bool:
+    """Checks whether OpenCV was built with the GStreamer video I/O backend"""
+    for line in cv2.getBuildInformation().splitlines():
+        if line.strip().startswith('GStreamer:'):
+            return 'YES' in line
+    return False
+
+
+class FrameRing:
+    """Single-producer/single-consumer ring of reusable frame buffers
+
+    The producer decodes into the slot after the newest frame and then publishes
+    it by advancing the head sequence number; the consumer copies the newest
+    slot. Neither side takes a lock: a plain attribute rebinding is atomic under
+    the GIL, and the consumer re-checks the head after copying, retrying in the
+    unlikely case that the producer lapped the ring and reused the slot meanwhile.
+    """
+
+    def __init__(self, capacity: int = 4):
+        """Initialize the ring
+
+        Args:
+            capacity: Number of frame slots, a power of two (at least 2)
+        """
+        self._mask = capacity - 1
+        self._slots = [None] * capacity
+        self._timestamps = [0.0] * capacity
+        self._head = 0  # Number of frames published (sequence of the newest frame)
+        self._tail = 0  # Sequence of the last frame handed to the consumer
+        self.frames_dropped = 0  # Published frames the consumer never read
+
+    @property
+    def head(self) -> int:
+        """Sequence number of the newest published frame (0 if none yet)"""
+        return self._head
+
+    @property
+    def consumed(self) -> bool:
+        """Whether the consumer has read the newest published frame"""
+        return self._tail == self._head
+
+    def write_buffer(self):
+        """Buffer the producer should decode the next frame into (None at first)"""
+        return self._slots[self._head & self._mask]
+
+    def publish(self, frame, timestamp: float):
+        """Publish a decoded frame (producer only)
+
+        Args:
+            frame: Decoded frame, normally the array returned by write_buffer()
+            timestamp: Capture timestamp of the frame
+        """
+        index = self._head & self._mask
+        self._slots[index] = frame
+        self._timestamps[index] = timestamp
+        self._head += 1
+
+    def latest_timestamp(self) -> float:
+        """Timestamp of the newest published frame, or 0.0 if there is none"""
+        head = self._head
+        return self._timestamps[(head - 1) & self._mask] if head else 0.0
+
+    def read_latest(self) -> Optional[Tuple[any, float, int]]:
+        """Copy the newest frame (consumer only)
+
+        Returns:
+            Tuple of (frame copy, timestamp, sequence number) or None if no frame
+            has been published yet
+        """
+        while True:
+            head = self._head
+            if head == 0:
+                return None
+            index = (head - 1) & self._mask
+            frame = self._slots[index]
+            timestamp = self._timestamps[index]
+            frame_copy = frame.copy()
+            # The producer reuses this slot only once it is capacity - 1 frames ahead
+            if self._head - head < self._mask:
+                break
+
+        if head > self._tail:
+            self.frames_dropped += head - self._tail - 1
+            self._tail = head
+        return frame_copy, timestamp, head
+
 
 class RTSPStreamReader:
     """RTSP stream reader with two modes: continuous (threaded) or reconnect_per_frame
@@ -14,8 +105,21 @@ class RTSPStreamReader:
     - reconnect_per_frame: Reconnects before each frame to guarantee fresh frames (no buffer)
     """
 
+    # Jetson hardware decode: H.264 on NVDEC, converted to BGR for OpenCV.
+    # appsink keeps only the newest buffer so stale frames never queue up.
+    JETSON_PIPELINE = ('rtspsrc location="{url}" protocols={transport} latency=0 ! '
+                       'rtph264depay ! h264parse ! nvv4l2decoder ! '
+                       'nvvidconv ! video/x-raw,format=BGRx ! '
+                       'videoconvert ! video/x-raw,format=BGR ! '
+                       'appsink drop=true max-buffers=1 sync=false')
+
+    # While the consumer has not read the newest frame yet, grabbed frames are
+    # only converted to replace it once it is this old (seconds)
+    MAX_UNREAD_FRAME_AGE = 0.1
+
     def __init__(self, rtsp_url: str, transport: str = 'udp', low_delay: bool = True, 
-                 mode: str = 'continuous'):
+                 mode: str = 'continuous', jetson_decode: bool = False,
+                 hw_decode: bool = False):
         """Initialize the RTSP stream reader
         
         Args:
@@ -23,31 +127,54 @@ class RTSPStreamReader:
             transport: Transport protocol ('udp' or 'tcp'), default 'udp'
             low_delay: Enable low-delay mode, default True
             mode: Connection mode ('continuous' or 'reconnect_per_frame'), default 'continuous'
+            jetson_decode: Decode on the Jetson NVDEC block through GStreamer, falling
+                back to FFmpeg for each connection attempt where the pipeline cannot
+                be opened, default False
+            hw_decode: Let FFmpeg decode on any available hardware decoder (VAAPI,
+                CUDA, ...), default False
         """
         self.rtsp_url = rtsp_url
         self.transport = transport.lower()
         self.low_delay = low_delay
         self.mode = mode.lower()
+        self._use_gstreamer = jetson_decode and _opencv_has_gstreamer()
+        if jetson_decode and not self._use_gstreamer:
+            logger.warning("⚠️  RTSP Reader: OpenCV has no GStreamer support, using FFmpeg")
+        self._decoding_on_jetson = False  # Whether the current capture uses the pipeline
+        # Open parameters for FFmpeg; hardware acceleration needs OpenCV 4.5.2+
+        self._capture_params = []
+        if hw_decode:
+            if hasattr(cv2, 'CAP_PROP_HW_ACCELERATION'):
+                self._capture_params = [cv2.CAP_PROP_HW_ACCELERATION,
+                                        cv2.VIDEO_ACCELERATION_ANY]
+            else:
+                logger.warning("⚠️  RTSP Reader: OpenCV too old for hardware decoding, using software")
+        
+        # FFmpeg capture options for low latency; set once, as writing the
+        # environment takes a process-wide lock in libc
+        capture_options = f"rtsp_transport;{'udp' if self.transport == 'udp' else 'tcp'}"
+        if self.low_delay:
+            capture_options += "|low_delay;1"
+        os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = capture_options
         
         if self.mode not in ['continuous', 'reconnect_per_frame']:
             self.mode = 'continuous'
         
-        # Thread-safe frame storage (for continuous mode)
-        self._lock = threading.Lock()
-        self._frame: Optional[Tuple[bool, any]] = None  # (success, frame)
-        self._frame_timestamp: float = 0.0
-        self._frame_number: int = 0
+        # Lock-free frame exchange with the reader thread (for continuous mode):
+        # frames are decoded directly into the ring's reusable buffers
+        self._ring = FrameRing(capacity=4)
+        self._frame_number: int = 0  # reconnect_per_frame mode
         
         # Control flags
-        self._stopped = False
+        self._stopped = threading.Event()  # Set by stop(), also wakes up backoff waits
         self._connected = False
         self._cap: Optional[cv2.VideoCapture] = None
         
         # Statistics
-        self._frames_read = 0
-        self._frames_dropped = 0
         self._last_error: Optional[str] = None
-        self._reconnection_times = []  # Track reconnection times for reconnect_per_frame mode
+        # Last 100 reconnection times (reconnect_per_frame mode) and their sum
+        self._reconnection_times = deque(maxlen=100)
+        self._reconnection_sum = 0.0
         self._last_reconnection_time = 0.0
         
         # Start the reader thread only in continuous mode
@@ -56,7 +183,7 @@ class RTSPStreamReader:
             self._thread.start()
         else:
             self._thread = None
-            print(f"✅ RTSP Reader: Initialized in reconnect_per_frame mode")
+            logger.info("✅ RTSP Reader: Initialized in reconnect_per_frame mode")
 
     def _build_rtsp_url(self) -> str:
         """Build RTSP URL with FFmpeg options for low latency"""
@@ -89,38 +216,66 @@ class RTSPStreamReader:
         else:
             return f"{url}?{param_string}"
 
+    def _open_capture(self, open_timeout_ms: int, read_timeout_ms: int) -> cv2.VideoCapture:
+        """Open the stream, with the Jetson GStreamer pipeline if enabled
+        
+        Args:
+            open_timeout_ms: FFmpeg open timeout in milliseconds
+            read_timeout_ms: FFmpeg read timeout in milliseconds
+        
+        Returns:
+            VideoCapture (check isOpened() before use)
+        """
+        if self._use_gstreamer:
+            pipeline = self.JETSON_PIPELINE.format(
+                url=self.rtsp_url, transport='udp' if self.transport == 'udp' else 'tcp')
+            cap = cv2.VideoCapture(pipeline, cv2.CAP_GSTREAMER)
+            if cap.isOpened():
+                self._decoding_on_jetson = True
+                return cap
+            cap.release()
+            # Missing plugins, a non-H.264 stream or just an unreachable camera:
+            # fall back for this attempt, the next reconnect tries the pipeline again
+            logger.warning("⚠️  RTSP Reader: Jetson hardware decode pipeline failed to open, "
+                           "trying FFmpeg")
+        self._decoding_on_jetson = False
+
+        # Build URL with FFmpeg options
+        if self._capture_params:
+            cap = cv2.VideoCapture(self._build_rtsp_url(), cv2.CAP_FFMPEG, self._capture_params)
+        else:
+            cap = cv2.VideoCapture(self._build_rtsp_url(), cv2.CAP_FFMPEG)
+        
+        # Set capture properties for low latency
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, open_timeout_ms)
+        cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, read_timeout_ms)
+        return cap
+
     def _read_loop(self):
         """Main loop running in separate thread - continuously reads frames"""
         retry_delay = 2
         max_retry_delay = 30
         
-        while not self._stopped:
+        while not self._stopped.is_set():
             try:
-                # Build URL with FFmpeg options
-                rtsp_url_with_options = self._build_rtsp_url()
-                
-                # Set FFmpeg environment variables for low latency
-                if self.transport == 'udp':
-                    os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;udp|low_delay;1"
-                else:
-                    os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp|low_delay;1"
-                
                 # Open video capture
-                self._cap = cv2.VideoCapture(rtsp_url_with_options, cv2.CAP_FFMPEG)
-                
-                # Set capture properties for low latency
-                self._cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                self._cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, 10000)
-                self._cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, 3000)
+                self._cap = self._open_capture(open_timeout_ms=10000, read_timeout_ms=3000)
                 
                 if not self._cap.isOpened():
                     self._last_error = "Failed to open RTSP stream"
-                    print(f"❌ RTSP Reader: {self._last_error}")
-                    time.sleep(retry_delay)
+                    logger.error("❌ RTSP Reader: %s", self._last_error)
+                    self._stopped.wait(retry_delay)
                     retry_delay = min(retry_delay * 1.5, max_retry_delay)
                     continue
                 
-                print(f"✅ RTSP Reader: Connected to stream (transport: {self.transport})")
+                decoder = 'nvv4l2decoder' if self._decoding_on_jetson else 'ffmpeg'
+                if self._capture_params and not self._decoding_on_jetson:
+                    # Falls back to software if no hardware decoder is available
+                    accelerated = self._cap.get(cv2.CAP_PROP_HW_ACCELERATION)
+                    decoder += ' (hardware)' if accelerated else ' (software)'
+                logger.info("✅ RTSP Reader: Connected to stream (transport: %s, decoder: %s)",
+                            self.transport, decoder)
                 self._connected = True
                 retry_delay = 2  # Reset retry delay on success
                 
@@ -128,36 +283,36 @@ class RTSPStreamReader:
                 consecutive_failures = 0
                 max_failures = 10
                 
-                while not self._stopped and self._cap.isOpened():
+                while not self._stopped.is_set() and self._cap.isOpened():
                     # Use grab() first - it's faster (no decoding)
                     if not self._cap.grab():
                         consecutive_failures += 1
                         if consecutive_failures >= max_failures:
-                            print("❌ RTSP Reader: Too many grab failures, reconnecting...")
+                            logger.error("❌ RTSP Reader: Too many grab failures, reconnecting...")
                             break
-                        time.sleep(0.1)
+                        self._stopped.wait(0.1)
+                        continue
+                    
+                    # A slow consumer (detection) would never see most frames: skip
+                    # their BGR conversion, but keep the unread frame reasonably fresh
+                    if (not self._ring.consumed and
+                            time.time() - self._ring.latest_timestamp() < self.MAX_UNREAD_FRAME_AGE):
+                        consecutive_failures = 0
                         continue
                     
-                    # Retrieve the frame (decode)
-                    ret, frame = self._cap.retrieve()
+                    # Retrieve the frame (decode) straight into the next ring slot
+                    ret, frame = self._cap.retrieve(self._ring.write_buffer())
                     
                     if ret and frame is not None:
-                        # Update frame in thread-safe manner
-                        with self._lock:
-                            # Count dropped frames (if we're overwriting an unread frame)
-                            if self._frame is not None and self._frame[0]:
-                                self._frames_dropped += 1
-                            
-                            self._frame = (True, frame.copy())
-                            self._frame_timestamp = time.time()
-                            self._frame_number += 1
-                            self._frames_read += 1
+                        # OpenCV allocates a new array on first use or when the
+                        # resolution changes; publish() keeps it as the slot's buffer
+                        self._ring.publish(frame, time.time())
                         
                         consecutive_failures = 0
                     else:
                         consecutive_failures += 1
                         if consecutive_failures >= max_failures:
-                            print("❌ RTSP Reader: Too many read failures, reconnecting...")
+                            logger.error("❌ RTSP Reader: Too many read failures, reconnecting...")
                             break
                 
                 # Clean up
@@ -166,11 +321,11 @@ class RTSPStreamReader:
                     self._cap = None
                 
                 self._connected = False
-                print("🔄 RTSP Reader: Disconnected, reconnecting...")
+                logger.warning("🔄 RTSP Reader: Disconnected, reconnecting...")
                 
             except Exception as e:
                 self._last_error = str(e)
-                print(f"⚠️  RTSP Reader error: {e}")
+                logger.warning("⚠️  RTSP Reader error: %s", e)
                 self._connected = False
                 if self._cap:
                     try:
@@ -178,7 +333,7 @@ class RTSPStreamReader:
                     except Exception:
                         pass
                     self._cap = None
-                time.sleep(retry_delay)
+                self._stopped.wait(retry_delay)
                 retry_delay = min(retry_delay * 1.5, max_retry_delay)
 
     def get_fresh_frame(self) -> Optional[Tuple[bool, any, float, int]]:
@@ -196,20 +351,8 @@ class RTSPStreamReader:
         reconnection_start = time.time()
         
         try:
-            # Build URL with FFmpeg options
-            rtsp_url_with_options = self._build_rtsp_url()
-            
-            # Set FFmpeg environment variables for low latency
-            if self.transport == 'udp':
-                os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;udp|low_delay;1"
-            else:
-                os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp|low_delay;1"
-            
             # Open video capture with minimal timeouts for fast reconnection
-            cap = cv2.VideoCapture(rtsp_url_with_options, cv2.CAP_FFMPEG)
-            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            cap.set(cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, 2000)  # 2 seconds for fast reconnection
-            cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, 2000)  # 2 seconds read timeout
+            cap = self._open_capture(open_timeout_ms=2000, read_timeout_ms=2000)
             
             if not cap.isOpened():
                 self._last_error = "Failed to open RTSP stream for fresh frame"
@@ -223,18 +366,18 @@ class RTSPStreamReader:
             
             reconnection_time = time.time() - reconnection_start
             self._last_reconnection_time = reconnection_time
+            if len(self._reconnection_times) == self._reconnection_times.maxlen:
+                self._reconnection_sum -= self._reconnection_times[0]  # Evicted by append
             self._reconnection_times.append(reconnection_time)
-            if len(self._reconnection_times) > 100:
-                self._reconnection_times.pop(0)  # Keep last 100
+            self._reconnection_sum += reconnection_time
             
             if ret and frame is not None:
-                self._frames_read += 1
                 self._frame_number += 1
                 frame_timestamp = time.time()
                 
                 # Warn if reconnection is slow
                 if reconnection_time > 1.0:
-                    print(f"⚠️  Slow reconnection: {reconnection_time:.2f}s")
+                    logger.warning("⚠️  Slow reconnection: %.2fs", reconnection_time)
                 
                 return (True, frame, frame_timestamp, self._frame_number)
             else:
@@ -243,12 +386,15 @@ class RTSPStreamReader:
                 
         except Exception as e:
             self._last_error = str(e)
-            print(f"⚠️  Error getting fresh frame: {e}")
+            logger.warning("⚠️  Error getting fresh frame: %s", e)
             return None
 
     def get_latest_frame(self) -> Optional[Tuple[bool, any, float, int]]:
         """Get the latest frame from the stream (continuous mode only)
         
+        The frame is copied out of the reader's ring buffer, whose slots are
+        reused for later frames.
+        
         Returns:
             Tuple of (success, frame, timestamp, frame_number) or None if no frame available
             - success: bool indicating if frame was successfully read
@@ -259,16 +405,11 @@ class RTSPStreamReader:
         if self.mode != 'continuous':
             raise RuntimeError("get_latest_frame() can only be used in continuous mode. Use get_fresh_frame() for reconnect_per_frame mode")
         
-        with self._lock:
-            if self._frame is None:
-                return None
-            
-            success, frame = self._frame
-            if success:
-                # Return a copy to prevent race conditions
-                return (True, frame.copy(), self._frame_timestamp, self._frame_number)
-            else:
-                return (False, None, self._frame_timestamp, self._frame_number)
+        latest = self._ring.read_latest()
+        if latest is None:
+            return None
+        frame, timestamp, frame_number = latest
+        return (True, frame, timestamp, frame_number)
 
     def get_frame_age(self) -> float:
         """Get the age of the current frame in seconds
@@ -276,10 +417,10 @@ class RTSPStreamReader:
         Returns:
             Age in seconds, or -1 if no frame available
         """
-        with self._lock:
-            if self._frame is None or self._frame_timestamp == 0:
-                return -1.0
-            return time.time() - self._frame_timestamp
+        frame_timestamp = self._ring.latest_timestamp()
+        if frame_timestamp == 0:
+            return -1.0
+        return time.time() - frame_timestamp
 
     def is_connected(self) -> bool:
         """Check if the stream is currently connected"""
@@ -299,23 +440,24 @@ class RTSPStreamReader:
             - last_reconnection_time: Last reconnection time in seconds (reconnect_per_frame mode)
             - avg_reconnection_time: Average reconnection time (reconnect_per_frame mode)
         """
+        # Every frame read gets the next frame number, so one counter serves both
+        frame_number = self._ring.head if self.mode == 'continuous' else self._frame_number
         stats = {
-            'frames_read': self._frames_read,
-            'frame_number': self._frame_number,
+            'frames_read': frame_number,
+            'frame_number': frame_number,
             'last_error': self._last_error,
             'mode': self.mode
         }
         
         if self.mode == 'continuous':
-            with self._lock:
-                stats.update({
-                    'frames_dropped': self._frames_dropped,
-                    'connected': self._connected
-                })
+            stats.update({
+                'frames_dropped': self._ring.frames_dropped,
+                'connected': self._connected
+            })
         else:  # reconnect_per_frame mode
             stats.update({
                 'last_reconnection_time': self._last_reconnection_time,
-                'avg_reconnection_time': (sum(self._reconnection_times) / len(self._reconnection_times) 
+                'avg_reconnection_time': (self._reconnection_sum / len(self._reconnection_times)
                                          if self._reconnection_times else 0.0)
             })
         
@@ -323,7 +465,7 @@ class RTSPStreamReader:
 
     def stop(self):
         """Stop the reader thread and release resources"""
-        self._stopped = True
+        self._stopped.set()
         if self.mode == 'continuous' and self._thread and self._thread.is_alive():
             self._thread.join(timeout=5.0)
         if self._cap:
@@ -332,5 +474,5 @@ class RTSPStreamReader:
             except Exception:
                 pass
             self._cap = None
-        print("🛑 RTSP Reader: Stopped")
+        logger.info("🛑 RTSP Reader: Stopped")
 
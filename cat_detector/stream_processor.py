@@ -2,11 +2,13 @@
 
 import os
 import time
+import logging
 import cv2
+import numpy as np
 import sys
 import threading
 import queue
-import copy
+from collections import deque
 
 # Add the parent directory to the Python path for absolute imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -20,32 +22,75 @@ from cat_detector.monitoring_collector import MonitoringCollector
 from cat_detector.monitoring_server import MonitoringServer
 from cat_detector.rtsp_stream_reader import RTSPStreamReader
 
+logger = logging.getLogger(__name__)
+
 
 class StreamProcessor:  # pylint: disable=too-few-public-methods
     """Main class for video stream processing"""
 
+    # Longest time (seconds) the first frame of a batch waits for the batch to
+    # fill; a partial batch is detected after that, e.g. when the stream stalls
+    MAX_BATCH_WAIT = 0.25
+
+    # Seconds between disk usage checks of the results folder
+    CLEANUP_INTERVAL = 60.0
+
+    # Box color (BGR) per class id for annotated frames
+    BOX_COLORS = {0: (255, 56, 56), 15: (56, 56, 255)}
+
     def __init__(self, config: Config, output_dir: str):
         self.config = config
         self.output_dir = output_dir
         # Use configured model if available, otherwise auto-detect
         model_path = config.yolo_model if config.yolo_model else None
-        self.detector = ObjectDetector(model_path=model_path, hardware_type=config.hardware_type)
+        self.detector = ObjectDetector(model_path=model_path, hardware_type=config.hardware_type,
+                                       motion_threshold=config.motion_threshold,
+                                       precision=config.precision,
+                                       imgsz=config.detection_size)
         self.mqtt_handler = MQTTHandler(config)
-        self.db_handler = DatabaseHandler(config)
+        self.db_handler = DatabaseHandler(config, is_jetson=self.detector.is_jetson)
+
+        # Frames per batched detection; batching only pays off on a GPU
+        self.batch_size = config.batch_size
+        if self.batch_size > 1 and not self.detector.uses_gpu:
+            logger.warning("⚠️  batch_size=%d ignored: no GPU, detecting frames one by one",
+                           self.batch_size)
+            self.batch_size = 1
+
+        # OpenCV sizes its pool to all cores; with CPU inference, resize and JPEG
+        # encoding are small next to detection, so leave the other half to PyTorch.
+        # With GPU inference those cores would sit idle, so OpenCV keeps them all
+        if not self.detector.uses_gpu:
+            cv2.setNumThreads(max(1, (os.cpu_count() or 1) // 2))
 
         # Frame timing for hourly saving
         self.last_frame_save_time = 0
         self.frame_save_interval = 3600  # 3600 seconds = 1 hour
 
         # Performance monitoring
-        self.processing_times = []  # Track last N processing times
         self.max_processing_times = 10  # Keep last 10 processing times
+        self.processing_times = deque(maxlen=self.max_processing_times)  # Track last N processing times
         self.target_fps = 1.0  # Target: process at least 1 frame per second
         self.max_processing_time = 1.0 / self.target_fps  # Max 1 second per frame
         self._total_frames_processed = 0  # Track total frames for monitoring frame updates
+        # Downscale 4K frames on the GPU: with OpenCV's CUDA module if it was built
+        # with one (device buffers reused across frames), else through OpenCL
+        self._cuda_buffers = None
+        try:
+            if cv2.cuda.getCudaEnabledDeviceCount() > 0:
+                self._cuda_buffers = (cv2.cuda_GpuMat(), cv2.cuda_GpuMat())
+                logger.info("✅ Resizing frames with CUDA")
+        except (AttributeError, cv2.error):
+            pass  # OpenCV without the CUDA module
+        self._resize_on_opencl = self._cuda_buffers is None and cv2.ocl.haveOpenCL()
+        if self._resize_on_opencl:
+            cv2.ocl.setUseOpenCL(True)
+            logger.info("✅ Resizing frames with OpenCL")
         
         # RTSP Stream Reader (will be initialized in run())
         self.stream_reader = None
+        # Set by stop() to end the main loop (e.g. from a SIGTERM handler)
+        self._stop_event = threading.Event()
 
         # Background task queues for non-blocking operations
         self.db_queue = queue.Queue(maxsize=10)  # Limit queue size to prevent memory issues
@@ -58,7 +103,7 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
             self.monitoring_collector = MonitoringCollector()
             self.monitoring_server = MonitoringServer(self.monitoring_collector, config.monitoring_port)
             self.monitoring_server.start()
-            print(f"✅ Monitoring enabled on port {config.monitoring_port}")
+            logger.info("✅ Monitoring enabled on port %d", config.monitoring_port)
         
         # Start background worker threads
         self._start_background_workers()
@@ -70,27 +115,28 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
     def _start_background_workers(self):
         """Starts background worker threads for non-blocking operations"""
         # Database worker thread
-        db_worker = threading.Thread(target=self._db_worker, daemon=True)
-        db_worker.start()
+        self._db_worker_thread = threading.Thread(target=self._db_worker, daemon=True)
+        self._db_worker_thread.start()
         
         # File save worker thread
-        file_worker = threading.Thread(target=self._file_worker, daemon=True)
-        file_worker.start()
+        self._file_worker_thread = threading.Thread(target=self._file_worker, daemon=True)
+        self._file_worker_thread.start()
         
-        print("✅ Background workers started for non-blocking operations")
+        logger.info("✅ Background workers started for non-blocking operations")
 
     def _db_worker(self):
         """Background worker thread for database operations"""
         while True:
             try:
-                task_start_time = time.time()
-                task = self.db_queue.get(timeout=1)
-                if task is None:  # Shutdown signal
+                task = self.db_queue.get()  # Sleeps until there is work
+                if task is None:  # Shutdown signal from shutdown()
+                    self.db_queue.task_done()
                     break
-                queue_wait_time = time.time() - task_start_time
-                frame, confidence, timestamp = task
+                frame, confidence, timestamp, queued_at = task
+                queue_wait_time = time.time() - queued_at
                 self.db_handler.save_frame_to_database(frame, confidence)
-                print(f"✅ Background: Detection image saved to database (Confidence: {confidence:.2f})")
+                logger.debug("✅ Background: Detection image queued for database batch (Confidence: %.2f)",
+                             confidence)
                 
                 # Update monitoring with queue wait time
                 if self.monitoring_collector:
@@ -102,34 +148,43 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
                     )
                 
                 self.db_queue.task_done()
-            except queue.Empty:
-                # Update monitoring even when queue is empty
-                if self.monitoring_collector:
-                    self.monitoring_collector.update_queue_status(
-                        self.db_queue.qsize(),
-                        0.0,
-                        self.file_queue.qsize(),
-                        0.0
-                    )
-                continue
             except Exception as e:
-                print(f"⚠️  Database worker error: {e}")
+                logger.warning("⚠️  Database worker error: %s", e)
                 self.db_queue.task_done()
 
     def _file_worker(self):
-        """Background worker thread for file operations"""
+        """Background worker thread for file operations
+        
+        Encodes each detection image once with the database handler's full-size
+        encoder (NVJPEG on Jetson) and uses the JPEG for both the results folder
+        and the database row.
+        """
+        next_cleanup = 0.0
         while True:
             try:
-                task_start_time = time.time()
-                task = self.file_queue.get(timeout=1)
-                if task is None:  # Shutdown signal
+                task = self.file_queue.get()  # Sleeps until there is work
+                if task is None:  # Shutdown signal from shutdown()
+                    self.file_queue.task_done()
                     break
-                queue_wait_time = time.time() - task_start_time
-                annotated_frame, timestamp = task
-                cleanup_results_folder(self.output_dir, self.config.usage_threshold)
+                annotated_frame, timestamp, confidence, queued_at = task
+                queue_wait_time = time.time() - queued_at
+                # A few frames saved between checks hardly move the disk usage
+                if time.monotonic() >= next_cleanup:
+                    cleanup_results_folder(self.output_dir, self.config.usage_threshold)
+                    next_cleanup = time.monotonic() + self.CLEANUP_INTERVAL
                 output_file = f'{self.output_dir}/frame_{timestamp}.jpg'
-                cv2.imwrite(output_file, annotated_frame)
-                print(f"✅ Background: Frame saved to {output_file}")
+                jpeg_bytes = self.db_handler.encode_full_jpeg(annotated_frame)
+                if not jpeg_bytes:
+                    raise ValueError("JPEG encoding failed")
+                # Database first: a failed file write (disk full, missing folder)
+                # must not cost the database row as well
+                self.db_handler.save_frame_to_database(annotated_frame, confidence,
+                                                       jpeg_bytes=jpeg_bytes)
+                logger.debug("✅ Background: Detection image queued for database batch (Confidence: %.2f)",
+                             confidence)
+                with open(output_file, 'wb') as file:
+                    file.write(jpeg_bytes)
+                logger.info("✅ Background: Frame saved to %s", output_file)
                 
                 # Update monitoring with queue wait time
                 if self.monitoring_collector:
@@ -141,30 +196,34 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
                     )
                 
                 self.file_queue.task_done()
-            except queue.Empty:
-                # Update monitoring even when queue is empty
-                if self.monitoring_collector:
-                    self.monitoring_collector.update_queue_status(
-                        self.db_queue.qsize(),
-                        0.0,
-                        self.file_queue.qsize(),
-                        0.0
-                    )
-                continue
             except Exception as e:
-                print(f"⚠️  File worker error: {e}")
+                logger.warning("⚠️  File worker error: %s", e)
                 self.file_queue.task_done()
 
-    def _save_detection(self, annotated_frame, timestamp: str):
-        """Queues the detected frame for background saving (non-blocking)"""
+    def _save_detection(self, annotated_frame, timestamp: str, confidence: float):
+        """Queues the detected frame for background saving (non-blocking)
+        
+        The file worker saves it to the results folder and to the database.
+        The frame is queued as is, so it must not be modified afterwards.
+        """
+        item = (annotated_frame, timestamp, confidence, time.time())
         try:
-            # Make a copy of the frame for the background thread
-            frame_copy = copy.deepcopy(annotated_frame)
-            self.file_queue.put_nowait((frame_copy, timestamp))
+            try:
+                self.file_queue.put_nowait(item)
+            except queue.Full:
+                # Drop the oldest pending save: consecutive detections look alike,
+                # and the newest frame is the one worth keeping
+                try:
+                    self.file_queue.get_nowait()
+                    self.file_queue.task_done()
+                except queue.Empty:
+                    pass  # The worker emptied the queue meanwhile
+                self.file_queue.put_nowait(item)
+                logger.warning("⚠️  File queue full, dropped oldest pending frame save (non-critical)")
         except queue.Full:
-            print("⚠️  File queue full, skipping frame save (non-critical)")
+            logger.warning("⚠️  File queue full, skipping frame save (non-critical)")
         except Exception as e:
-            print(f"⚠️  Error queueing frame save: {e}")
+            logger.warning("⚠️  Error queueing frame save: %s", e)
 
     def _resize_frame_to_fullhd(self, frame):
         """Reduces frame resolution from 4K to Full HD (1920x1080)"""
@@ -175,12 +234,25 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
         target_width = 1920
         target_height = 1080
 
-        # Only resize if frame is larger than Full HD
+        # Only resize if frame is larger than Full HD; bilinear is clearly faster
+        # than INTER_AREA and the detector letterboxes the frame again anyway
         if width > target_width or height > target_height:
-            resized_frame = cv2.resize(frame, (target_width, target_height),
-                                     interpolation=cv2.INTER_AREA)
-            print(f"Frame resized from {width}x{height} to "
-                  f"{target_width}x{target_height}")
+            if self._cuda_buffers is not None:
+                # The detector needs a numpy array, so read the result back
+                gpu_frame, gpu_resized = self._cuda_buffers
+                gpu_frame.upload(frame)
+                resized_frame = cv2.cuda.resize(gpu_frame, (target_width, target_height),
+                                                dst=gpu_resized,
+                                                interpolation=cv2.INTER_LINEAR).download()
+            elif self._resize_on_opencl:
+                # The detector needs a numpy array, so read the result back
+                resized_frame = cv2.resize(cv2.UMat(frame), (target_width, target_height),
+                                         interpolation=cv2.INTER_LINEAR).get()
+            else:
+                resized_frame = cv2.resize(frame, (target_width, target_height),
+                                         interpolation=cv2.INTER_LINEAR)
+            logger.debug("Frame resized from %dx%d to %dx%d",
+                         width, height, target_width, target_height)
             resize_time = time.time() - resize_start
             # Update monitoring
             if self.monitoring_collector:
@@ -196,6 +268,18 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
             self.monitoring_collector.update_timing_breakdown(timing)
         return frame
 
+    @staticmethod
+    def _timestamps(now: float):
+        """Formats a time.time() value for file names and for log output
+        
+        Returns:
+            Tuple of ('YYYY-mm-dd_HH-MM-SS-mmm', 'YYYY-mm-dd HH:MM:SS')
+        """
+        # time.strftime has no %f, so the milliseconds are appended by hand
+        local_time = time.localtime(now)
+        return (f"{time.strftime('%Y-%m-%d_%H-%M-%S', local_time)}-{int(now % 1 * 1000):03d}",
+                time.strftime('%Y-%m-%d %H:%M:%S', local_time))
+
     def _save_frame_to_database_if_needed(self, frame):
         """Queues the current frame for database save if one hour has passed (non-blocking)"""
         current_time = time.time()
@@ -204,27 +288,50 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
             self.last_frame_save_time = current_time
             try:
                 # Queue for background processing
-                frame_copy = copy.deepcopy(frame)
-                self.db_queue.put_nowait((frame_copy, 0.0, time.strftime('%Y-%m-%d_%H-%M-%S-%f')[:-3]))
-                timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-                print(f"✅ Hourly frame queued for database save at {timestamp}")
+                frame_copy = frame.copy()
+                file_timestamp, timestamp = self._timestamps(current_time)
+                self.db_queue.put_nowait((frame_copy, 0.0, file_timestamp, current_time))
+                logger.info("✅ Hourly frame queued for database save at %s", timestamp)
                 return True
             except queue.Full:
-                print("⚠️  Database queue full, skipping hourly frame save")
+                logger.warning("⚠️  Database queue full, skipping hourly frame save")
                 return False
             except Exception as e:
-                print(f"⚠️  Error queueing hourly frame save: {e}")
+                logger.warning("⚠️  Error queueing hourly frame save: %s", e)
                 return False
 
         return False
 
-    def _process_detections(self, frame, detections, results, timestamp, timestamp_readable, detection_time: float):
+    def _annotate_frame(self, frame, detections):
+        """Returns a copy of the frame with boxes and labels drawn for all detections
+        
+        Draws with OpenCV from the detections already extracted, which is much
+        cheaper than rendering the YOLO results with result.plot().
+        """
+        annotated_frame = frame.copy()  # The frame itself may still be in use (monitoring)
+        line_width = max(round(sum(frame.shape[:2]) / 2 * 0.003), 2)
+        font_scale = line_width / 3
+        for class_id, confidence, bbox in detections:
+            color = self.BOX_COLORS.get(class_id, (0, 255, 0))
+            x1, y1, x2, y2 = (int(v) for v in bbox)
+            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, line_width, cv2.LINE_AA)
+            label = f"{self.detector.CLASS_NAMES.get(class_id, 'Unknown')} {confidence:.2f}"
+            (text_w, text_h), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX,
+                                                         font_scale, max(line_width - 1, 1))
+            # Label on a filled box above the bounding box (below it at the top edge)
+            label_y = y1 if y1 - text_h - baseline >= 0 else y1 + text_h + baseline
+            cv2.rectangle(annotated_frame, (x1, label_y - text_h - baseline), (x1 + text_w, label_y),
+                          color, -1, cv2.LINE_AA)
+            cv2.putText(annotated_frame, label, (x1, label_y - baseline), cv2.FONT_HERSHEY_SIMPLEX,
+                        font_scale, (255, 255, 255), max(line_width - 1, 1), cv2.LINE_AA)
+        return annotated_frame
+
+    def _process_detections(self, frame, detections, timestamp, timestamp_readable, detection_time: float):
         """Processes the detections with priority: MQTT first, then background tasks
         
         Args:
             frame: The video frame
             detections: List of detections
-            results: YOLO results object
             timestamp: Timestamp string (generated BEFORE detection to avoid delay)
             timestamp_readable: Human-readable timestamp
             detection_time: Time taken for detection in seconds
@@ -233,36 +340,46 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
             Total MQTT publish time (sum of all MQTT publishes)
         """
         total_mqtt_time = 0.0
-        for class_id, confidence, bbox in detections:
+        # Ignore zone test for all boxes at once
+        in_ignore_zone = self.detector.ignore_mask(
+            np.asarray([bbox for _, _, bbox in detections], dtype=np.float32).reshape(-1, 4),
+            frame.shape, self.config.ignore_zone)
+
+        # Filter first: the frame is annotated and saved once, however many
+        # detections are reported
+        reported = []
+        debug = logger.isEnabledFor(logging.DEBUG)  # Checked once, not per box
+        for (class_id, confidence, bbox), ignored in zip(detections, in_ignore_zone):
             class_name = self.detector.CLASS_NAMES.get(class_id, "Unknown")
-            if confidence > self.config.confidence_threshold:
-                print(f"✅ Processing {class_name} (Confidence: {confidence:.4f} > Threshold: {self.config.confidence_threshold})")
-            else:
-                print(f"❌ Skipping {class_name} (Confidence: {confidence:.4f} <= Threshold: {self.config.confidence_threshold})")
+            if confidence <= self.config.confidence_threshold:
+                if debug:
+                    logger.debug("❌ Skipping %s (Confidence: %.4f <= Threshold: %s)",
+                                 class_name, confidence, self.config.confidence_threshold)
                 continue
+            if debug:
+                logger.debug("✅ Processing %s (Confidence: %.4f > Threshold: %s)",
+                             class_name, confidence, self.config.confidence_threshold)
             
             # Check ignore zone
-            if self.detector.is_in_ignore_zone(bbox, frame.shape,
-                                             self.config.ignore_zone):
-                print(f"⏭️  {class_name} in ignore zone, skipping")
+            if ignored:
+                if debug:
+                    logger.debug("⏭️  %s in ignore zone, skipping", class_name)
                 continue
 
-            # Annotate frame
-            annotated_frame = None
-            for result in results:
-                annotated_frame = result.plot()
-                break
+            reported.append((class_id, class_name, confidence, bbox))
 
-            if annotated_frame is None:
-                continue
+        if not reported:
+            return total_mqtt_time
 
+        for class_id, class_name, confidence, bbox in reported:
             # PRIORITY 1: Send MQTT message IMMEDIATELY (non-blocking, highest priority)
             # This ensures the detection is reported as fast as possible
             mqtt_start = time.time()
             self.mqtt_handler.publish_detection(class_name, confidence, timestamp)
             mqtt_time = time.time() - mqtt_start
             total_mqtt_time += mqtt_time
-            print(f'[{timestamp_readable}] 🚨 Detected: {class_name} (ID: {class_id}, Confidence: {confidence:.4f}) - MQTT sent')
+            logger.info("[%s] 🚨 Detected: %s (ID: %d, Confidence: %.4f) - MQTT sent",
+                        timestamp_readable, class_name, class_id, confidence)
             
             # Update monitoring with detection
             if self.monitoring_collector:
@@ -270,33 +387,190 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
                     class_name, confidence, bbox, timestamp, detection_time
                 )
 
-            # PRIORITY 2: Queue frame for background file saving (non-blocking)
-            self._save_detection(annotated_frame, timestamp)
+        # Annotate frame; the annotated copy belongs to this frame alone and the
+        # file worker only reads it, so it is queued without copying again
+        annotated_frame = self._annotate_frame(frame, detections)
+
+        # PRIORITY 2: Queue frame for background file and database saving
+        # (non-blocking), one database row per frame with the highest reported
+        # confidence
+        confidence = max(confidence for _, _, confidence, _ in reported)
+        self._save_detection(annotated_frame, timestamp, confidence)
+        
+        return total_mqtt_time
+
+    def stop(self):
+        """Ends the main loop after the current frame (safe to call from a signal handler)"""
+        self._stop_event.set()
 
-            # PRIORITY 3: Queue database save for background (non-blocking)
+    def shutdown(self, timeout: float = 10.0):
+        """Stops the background workers once the saves queued so far are done
+
+        The database handler writes its pending rows before it is closed.
+
+        Args:
+            timeout: Seconds to wait for each worker to finish
+        """
+        # The workers block on get(), the None sentinel wakes them up to exit
+        for worker_queue, worker in ((self.db_queue, self._db_worker_thread),
+                                     (self.file_queue, self._file_worker_thread)):
             try:
-                # Make a copy of the frame for the background thread
-                frame_copy = copy.deepcopy(annotated_frame)
-                self.db_queue.put_nowait((frame_copy, confidence, timestamp))
+                worker_queue.put(None, timeout=timeout)
+                worker.join(timeout)
             except queue.Full:
-                print("⚠️  Database queue full, skipping DB save (non-critical)")
-            except Exception as e:
-                print(f"⚠️  Error queueing database save: {e}")
+                logger.warning("⚠️  Background worker stuck, %d queued save(s) not done",
+                               worker_queue.qsize())
+        # Both workers hand their rows to the database handler, close it last
+        self.db_handler.close(timeout)
+
+    def _detect_batch(self, pending):
+        """Detects a batch of collected frames in one forward pass and finishes each
         
-        return total_mqtt_time
+        Args:
+            pending: List of (frame, frame_number, frame_age, frame_start_time,
+                timing_breakdown, timestamp, timestamp_readable) tuples
+        """
+        detection_start = time.time()
+        batch_results = self.detector.detect_batch([item[0] for item in pending])
+        # Each frame's share of the batch
+        detection_time = (time.time() - detection_start) / len(pending)
+        for item, (detections, results) in zip(pending, batch_results):
+            self._finish_frame(*item, detections, results, detection_time)
+
+    def _finish_frame(self, frame, frame_number, frame_age, frame_start_time,  # pylint: disable=too-many-arguments,too-many-locals
+                      timing_breakdown, timestamp, timestamp_readable,
+                      detections, results, detection_time):
+        """Processes the detections of one frame and records its timing
+        
+        Args:
+            frame: The analyzed frame
+            frame_number: Frame number from the reader
+            frame_age: Seconds between capture and processing
+            frame_start_time: time.time() when processing of the frame started
+            timing_breakdown: Timing dict of the frame, completed here
+            timestamp: Timestamp string (generated BEFORE detection to avoid delay)
+            timestamp_readable: Human-readable timestamp
+            detections: Detections of the frame from the detector
+            results: YOLO results of the frame
+            detection_time: Detection time in seconds attributed to this frame
+        """
+        timing_breakdown['detection'] = detection_time
+
+        # Debug: Print all detections before filtering
+        if detections and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🔍 Found %d detection(s) before filtering "
+                         "(detection took %.3fs, frame age: %.3fs):",
+                         len(detections), detection_time, frame_age)
+            for class_id, confidence, bbox in detections:
+                class_name = self.detector.CLASS_NAMES.get(class_id, "Unknown")
+                logger.debug("   - %s (ID: %d, Confidence: %.4f, Threshold: %s)",
+                             class_name, class_id, confidence, self.config.confidence_threshold)
+
+        # Process detections (pass timestamp from before detection)
+        # MQTT is sent immediately, DB and file save happen in background
+        detection_processing_start = time.time()
+        mqtt_total_time = 0.0
+        if detections:
+            mqtt_total_time = self._process_detections(frame, detections, timestamp, timestamp_readable, detection_time)
+        timing_breakdown['detection_processing'] = time.time() - detection_processing_start
+        timing_breakdown['mqtt_publish'] = mqtt_total_time
+        
+        # Explicitly free YOLO results to prevent memory leaks
+        memory_cleanup_start = time.time()
+        del results
+        del detections
+        timing_breakdown['memory_cleanup'] = time.time() - memory_cleanup_start
+        
+        # Track processing time
+        total_processing_time = time.time() - frame_start_time
+        timing_breakdown['total'] = total_processing_time
+        
+        # Increment frame counter
+        self._total_frames_processed += 1
+        
+        # Calculate unaccounted time (time not tracked in other measurements)
+        # This helps identify hidden bottlenecks
+        accounted_time = sum([
+            timing_breakdown.get('frame_read', 0.0),
+            timing_breakdown.get('reconnection_time', 0.0),
+            timing_breakdown.get('resize', 0.0),
+            timing_breakdown.get('detection', 0.0),
+            timing_breakdown.get('detection_processing', 0.0),
+            timing_breakdown.get('mqtt_publish', 0.0),
+            timing_breakdown.get('save_database_check', 0.0),
+            timing_breakdown.get('monitoring_update', 0.0),
+            timing_breakdown.get('timestamp_generation', 0.0),
+            timing_breakdown.get('memory_cleanup', 0.0),
+            timing_breakdown.get('db_queue_wait', 0.0),
+            timing_breakdown.get('file_queue_wait', 0.0)
+        ])
+        timing_breakdown['unaccounted_time'] = max(0.0, total_processing_time - accounted_time)
+        
+        # Update monitoring with all timing information
+        if self.monitoring_collector:
+            self.monitoring_collector.update_timing_breakdown(timing_breakdown)
+            self.monitoring_collector.update_processing_time(total_processing_time)
+            # Update queue status
+            self.monitoring_collector.update_queue_status(
+                self.db_queue.qsize(),
+                0.0,  # Will be updated by workers
+                self.file_queue.qsize(),
+                0.0   # Will be updated by workers
+            )
+        
+        self.processing_times.append(total_processing_time)
+        
+        # Detailed logging for slow frames (>5 seconds)
+        if total_processing_time > 5.0:
+            logger.warning(
+                "\n🐌 SLOW FRAME DETECTED: %.2fs (Frame #%d)\n"
+                "   Detailed Breakdown:\n"
+                "   - Frame Read:        %.3fs\n"
+                "   - Reconnection:      %.3fs\n"
+                "   - Resize:            %.3fs\n"
+                "   - Detection:         %.3fs\n"
+                "   - Detection Process: %.3fs\n"
+                "   - MQTT Publish:      %.3fs\n"
+                "   - DB Check:          %.3fs\n"
+                "   - Monitoring Update: %.3fs\n"
+                "   - Memory Cleanup:     %.3fs\n"
+                "   - Timestamp Gen:     %.3fs\n"
+                "   - Unaccounted Time:  %.3fs\n"
+                "   - Frame Age:         %.3fs\n",
+                total_processing_time, frame_number,
+                timing_breakdown.get('frame_read', 0.0),
+                timing_breakdown.get('reconnection_time', 0.0),
+                timing_breakdown.get('resize', 0.0),
+                timing_breakdown.get('detection', 0.0),
+                timing_breakdown.get('detection_processing', 0.0),
+                timing_breakdown.get('mqtt_publish', 0.0),
+                timing_breakdown.get('save_database_check', 0.0),
+                timing_breakdown.get('monitoring_update', 0.0),
+                timing_breakdown.get('memory_cleanup', 0.0),
+                timing_breakdown.get('timestamp_generation', 0.0),
+                timing_breakdown.get('unaccounted_time', 0.0),
+                frame_age)
+        
+        # Warn if processing is getting slow
+        elif total_processing_time > 2.0:
+            logger.warning("⚠️  Slow frame processing: %.2fs (target: <%.2fs, frame age: %.3fs)",
+                           total_processing_time, self.max_processing_time, frame_age)
 
     def run(self):
         """Main loop for stream processing using RTSP reader (continuous or reconnect_per_frame mode)"""
-        print(f"🎥 Initializing RTSP stream reader: {self.config.rtsp_stream_url}")
-        print(f"   Transport: {self.config.rtsp_transport}, Low delay: {self.config.rtsp_low_delay}")
-        print(f"   Connection mode: {self.config.rtsp_connection_mode}")
+        logger.info("🎥 Initializing RTSP stream reader: %s", self.config.rtsp_stream_url)
+        logger.info("   Transport: %s, Low delay: %s",
+                    self.config.rtsp_transport, self.config.rtsp_low_delay)
+        logger.info("   Connection mode: %s", self.config.rtsp_connection_mode)
         
         # Initialize RTSP stream reader with configured mode
         self.stream_reader = RTSPStreamReader(
             self.config.rtsp_stream_url,
             transport=self.config.rtsp_transport,
             low_delay=self.config.rtsp_low_delay,
-            mode=self.config.rtsp_connection_mode
+            mode=self.config.rtsp_connection_mode,
+            jetson_decode=self.detector.is_jetson,
+            hw_decode=self.config.rtsp_hw_decode
         )
         
         # Wait a bit for the reader to connect (only in continuous mode)
@@ -309,9 +583,11 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
         
         consecutive_no_frame_count = 0
         max_consecutive_no_frame = 30  # Allow up to 30 attempts without frame before warning
+        pending = []  # Frames waiting for a batched detection (batch_size > 1)
+        last_frame_number = None  # Newest frame handed to detection
         
         # Main processing loop
-        while True:
+        while not self._stop_event.is_set():
             # Start timing for performance monitoring
             frame_start_time = time.time()
             timing_breakdown = {
@@ -347,9 +623,9 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
                 if consecutive_no_frame_count >= max_consecutive_no_frame:
                     if self.config.rtsp_connection_mode == 'continuous':
                         if not self.stream_reader.is_connected():
-                            print("⚠️  RTSP Reader not connected, waiting for reconnection...")
+                            logger.warning("⚠️  RTSP Reader not connected, waiting for reconnection...")
                     else:
-                        print("⚠️  Failed to get fresh frame, retrying...")
+                        logger.warning("⚠️  Failed to get fresh frame, retrying...")
                     consecutive_no_frame_count = 0  # Reset counter
                 time.sleep(0.1)  # Short sleep to avoid busy waiting
                 continue
@@ -365,6 +641,17 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
             # Reset no-frame counter on successful read
             consecutive_no_frame_count = 0
             
+            # The reader hands out its newest frame until a new one arrives; detect
+            # each frame only once, also right after a batch was flushed
+            if frame_number == last_frame_number:
+                if pending and time.time() - pending[0][3] >= self.MAX_BATCH_WAIT:
+                    self._detect_batch(pending)
+                    pending = []
+                else:
+                    time.sleep(0.005)
+                continue
+            last_frame_number = frame_number
+            
             # Calculate frame age (time between capture and now)
             # In reconnect_per_frame mode, frame_age should be ~0 (fresh frame)
             frame_age = time.time() - frame_timestamp
@@ -372,7 +659,8 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
             
             # Warn if frame is too old (indicates drift) - should not happen in reconnect_per_frame mode
             if frame_age > 2.0:
-                print(f"⚠️  Old frame detected: {frame_age:.2f}s old (Frame #{frame_number}, Mode: {self.config.rtsp_connection_mode})")
+                logger.warning("⚠️  Old frame detected: %.2fs old (Frame #%d, Mode: %s)",
+                               frame_age, frame_number, self.config.rtsp_connection_mode)
             
             # Update monitoring with frame age and reconnection time
             if self.monitoring_collector:
@@ -386,8 +674,7 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
             
             # Generate timestamp BEFORE processing to capture actual detection time
             timestamp_start = time.time()
-            timestamp = time.strftime('%Y-%m-%d_%H-%M-%S-%f')[:-3]
-            timestamp_readable = time.strftime('%Y-%m-%d %H:%M:%S')
+            timestamp, timestamp_readable = self._timestamps(timestamp_start)
             timing_breakdown['timestamp_generation'] = time.time() - timestamp_start
 
             # Reduce frame resolution from 4K to Full HD
@@ -408,108 +695,38 @@ class StreamProcessor:  # pylint: disable=too-few-public-methods
             timing_breakdown['save_database_check'] = time.time() - db_check_start
 
             # Object detection (this is the main blocking operation)
-            detection_start = time.time()
-            detections, results = self.detector.detect_objects(frame)
-            detection_time = time.time() - detection_start
-            timing_breakdown['detection'] = detection_time
-
-            # Debug: Print all detections before filtering
-            if detections:
-                print(f"🔍 Found {len(detections)} detection(s) before filtering "
-                      f"(detection took {detection_time:.3f}s, frame age: {frame_age:.3f}s):")
-                for class_id, confidence, bbox in detections:
-                    class_name = self.detector.CLASS_NAMES.get(class_id, "Unknown")
-                    print(f"   - {class_name} (ID: {class_id}, Confidence: {confidence:.4f}, "
-                          f"Threshold: {self.config.confidence_threshold})")
-
-            # Process detections (pass timestamp from before detection)
-            # MQTT is sent immediately, DB and file save happen in background
-            detection_processing_start = time.time()
-            mqtt_total_time = 0.0
-            if detections:
-                mqtt_total_time = self._process_detections(frame, detections, results, timestamp, timestamp_readable, detection_time)
-            timing_breakdown['detection_processing'] = time.time() - detection_processing_start
-            timing_breakdown['mqtt_publish'] = mqtt_total_time
-            
-            # Explicitly free YOLO results to prevent memory leaks
-            memory_cleanup_start = time.time()
-            del results
-            del detections
-            timing_breakdown['memory_cleanup'] = time.time() - memory_cleanup_start
-            
-            # Track processing time
-            total_processing_time = time.time() - frame_start_time
-            timing_breakdown['total'] = total_processing_time
-            
-            # Increment frame counter
-            self._total_frames_processed += 1
-            
-            # Calculate unaccounted time (time not tracked in other measurements)
-            # This helps identify hidden bottlenecks
-            accounted_time = sum([
-                timing_breakdown.get('frame_read', 0.0),
-                timing_breakdown.get('reconnection_time', 0.0),
-                timing_breakdown.get('resize', 0.0),
-                timing_breakdown.get('detection', 0.0),
-                timing_breakdown.get('detection_processing', 0.0),
-                timing_breakdown.get('mqtt_publish', 0.0),
-                timing_breakdown.get('save_database_check', 0.0),
-                timing_breakdown.get('monitoring_update', 0.0),
-                timing_breakdown.get('timestamp_generation', 0.0),
-                timing_breakdown.get('memory_cleanup', 0.0),
-                timing_breakdown.get('db_queue_wait', 0.0),
-                timing_breakdown.get('file_queue_wait', 0.0)
-            ])
-            timing_breakdown['unaccounted_time'] = max(0.0, total_processing_time - accounted_time)
-            
-            # Update monitoring with all timing information
-            if self.monitoring_collector:
-                self.monitoring_collector.update_timing_breakdown(timing_breakdown)
-                self.monitoring_collector.update_processing_time(total_processing_time)
-                # Update queue status
-                self.monitoring_collector.update_queue_status(
-                    self.db_queue.qsize(),
-                    0.0,  # Will be updated by workers
-                    self.file_queue.qsize(),
-                    0.0   # Will be updated by workers
-                )
-            
-            self.processing_times.append(total_processing_time)
-            if len(self.processing_times) > self.max_processing_times:
-                self.processing_times.pop(0)  # Keep only last N times
-            
-            # Detailed logging for slow frames (>5 seconds)
-            if total_processing_time > 5.0:
-                print(f"\n🐌 SLOW FRAME DETECTED: {total_processing_time:.2f}s (Frame #{frame_number})")
-                print(f"   Detailed Breakdown:")
-                print(f"   - Frame Read:        {timing_breakdown.get('frame_read', 0.0):.3f}s")
-                print(f"   - Reconnection:      {timing_breakdown.get('reconnection_time', 0.0):.3f}s")
-                print(f"   - Resize:            {timing_breakdown.get('resize', 0.0):.3f}s")
-                print(f"   - Detection:         {timing_breakdown.get('detection', 0.0):.3f}s")
-                print(f"   - Detection Process: {timing_breakdown.get('detection_processing', 0.0):.3f}s")
-                print(f"   - MQTT Publish:      {timing_breakdown.get('mqtt_publish', 0.0):.3f}s")
-                print(f"   - DB Check:          {timing_breakdown.get('save_database_check', 0.0):.3f}s")
-                print(f"   - Monitoring Update: {timing_breakdown.get('monitoring_update', 0.0):.3f}s")
-                print(f"   - Memory Cleanup:     {timing_breakdown.get('memory_cleanup', 0.0):.3f}s")
-                print(f"   - Timestamp Gen:     {timing_breakdown.get('timestamp_generation', 0.0):.3f}s")
-                print(f"   - Unaccounted Time:  {timing_breakdown.get('unaccounted_time', 0.0):.3f}s")
-                print(f"   - Frame Age:         {frame_age:.3f}s")
-                print()
-            
-            # Warn if processing is getting slow
-            elif total_processing_time > 2.0:
-                print(f"⚠️  Slow frame processing: {total_processing_time:.2f}s "
-                      f"(target: <{self.max_processing_time:.2f}s, frame age: {frame_age:.3f}s)")
+            if self.batch_size > 1:
+                # Collect frames and detect them with one batched forward pass
+                pending.append((frame, frame_number, frame_age, frame_start_time,
+                                timing_breakdown, timestamp, timestamp_readable))
+                if (len(pending) < self.batch_size and
+                        time.time() - pending[0][3] < self.MAX_BATCH_WAIT):
+                    time.sleep(0.01)
+                    continue
+                self._detect_batch(pending)
+                pending = []
+            else:
+                detection_start = time.time()
+                detections, results = self.detector.detect_objects(frame)
+                detection_time = time.time() - detection_start
+                self._finish_frame(frame, frame_number, frame_age, frame_start_time,
+                                   timing_breakdown, timestamp, timestamp_readable,
+                                   detections, results, detection_time)
+                del results
+                del detections
             
             # Small sleep to prevent CPU spinning (reader thread handles frame updates)
             # This allows the reader thread to keep the buffer clean
             time.sleep(0.01)
 
-        # Cleanup (should never reach here, but just in case)
+        # Cleanup after stop(); frames collected for a batch are still detected
+        if pending:
+            self._detect_batch(pending)
         if self.stream_reader:
             self.stream_reader.stop()
+        self.shutdown()
+        self.mqtt_handler.disconnect()
         if self.monitoring_collector:
             self.monitoring_collector.set_streaming_status(False)
         
-        print(f'Frames with detected objects are saved in folder '
-              f'"{self.output_dir}".')
+        logger.info('Frames with detected objects are saved in folder "%s".', self.output_dir)